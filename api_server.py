@@ -0,0 +1,42 @@
+"""
+Drug Risk API Server
+Serves the published marts as read-only JSON next to the dashboard
+(see utils/api.py for endpoints). Picks up new snapshots from
+`precompute.py` without a restart.
+
+Usage:
+    python api_server.py
+    python api_server.py --port 8502 --sample
+    curl localhost:8502/drugs/ASPIRIN
+    curl 'localhost:8502/drugs?name=ASPIRIN,HUMIRA'
+"""
+
+import argparse
+import logging
+
+from utils.api import make_server
+from utils.marts import MARTS_DIR, marts_root
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--marts', default=str(MARTS_DIR), help='Base directory precompute.py publishes to')
+    parser.add_argument('--sample', action='store_true', help='Serve the stratified-sample dataset')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    server = make_server(marts_root(sampled=args.sample, base=args.marts), args.host, args.port)
+    logging.info(f"Serving snapshot {server.snapshots.index.version} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Drug API Load Benchmark
+Publishes a synthetic snapshot, starts the JSON API on a free port and
+drives it from concurrent keep-alive clients, reporting throughput and
+latency percentiles per request type
+
+Usage:
+    python benchmarks/bench_api.py --rows 300000 --clients 16 --seconds 10
+"""
+
+import argparse
+import http.client
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from utils.api import make_server
+from utils.marts import build_view_tables
+from utils.snapshot import publish_snapshot
+from utils.transform import transform
+from synthetic import make_events
+
+
+def publish_synthetic(root: Path, rows: int, drugs: int) -> list:
+    """Publish a synthetic snapshot and return its drug names"""
+    frames = transform(make_events(rows, n_drugs=drugs))
+    frames.update(build_view_tables(frames['events'], frames['drug_risk_profile']))
+    publish_snapshot(frames, root)
+    return frames['drug_risk_profile']['drug_name'].tolist()
+
+
+def client_loop(port: int, drugs: list, batch_size: int, deadline: float, seed: int, results: dict):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    etag = None
+    latencies = defaultdict(list)
+    statuses = defaultdict(int)
+
+    while time.perf_counter() < deadline:
+        kind = rng.choices(['single', 'batch', 'search', 'view', 'revalidate'], weights=[50, 15, 15, 10, 10])[0]
+        method, body, headers = 'GET', None, {}
+        if kind == 'single':
+            path = f"/drugs/{quote(rng.choice(drugs), safe='')}"
+        elif kind == 'batch':
+            method = 'POST'
+            body = json.dumps({'names': rng.sample(drugs, min(batch_size, len(drugs)))}).encode()
+            headers['Content-Type'] = 'application/json'
+            path = '/drugs'
+        elif kind == 'search':
+            path = f"/search?q={quote(rng.choice(drugs)[:6])}"
+        elif kind == 'view':
+            path = '/views/overview_stats'
+        else:
+            path = '/views/top_drugs'
+            if etag:
+                headers['If-None-Match'] = etag
+
+        start = time.perf_counter()
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies[kind].append(time.perf_counter() - start)
+        statuses[response.status] += 1
+        if kind == 'revalidate':
+            etag = response.getheader('ETag')
+
+    conn.close()
+    results[seed] = (latencies, statuses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=300_000)
+    parser.add_argument('--drugs', type=int, default=5_000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--batch-size', type=int, default=50, help='Drugs per batch lookup')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        drugs = publish_synthetic(Path(tmp), args.rows, args.drugs)
+        print(f"Published {args.rows:,} rows / {len(drugs):,} drugs in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        server = make_server(tmp, port=0)
+        print(f"Index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        results = {}
+        deadline = time.perf_counter() + args.seconds
+        threads = [
+            threading.Thread(target=client_loop, args=(port, drugs, args.batch_size, deadline, seed, results))
+            for seed in range(args.clients)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        server.shutdown()
+        server.server_close()
+
+    latencies, statuses = defaultdict(list), defaultdict(int)
+    for client_latencies, client_statuses in results.values():
+        for kind, values in client_latencies.items():
+            latencies[kind].extend(values)
+        for status, count in client_statuses.items():
+            statuses[status] += count
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"\n{args.clients} clients, {args.seconds:.0f}s: {total:,} requests, {total / args.seconds:,.0f} req/s")
+    print(f"Status codes: {dict(sorted(statuses.items()))}")
+    print(f"\n{'request':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for kind, values in sorted(latencies.items()):
+        ms = np.array(values) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        print(f"{kind:<12}{len(ms):>8,}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
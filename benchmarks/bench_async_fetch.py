@@ -0,0 +1,106 @@
+"""
+Async Pagination Benchmark
+Serves synthetic records from a local openFDA stand-in with a fixed
+per-request latency and compares the blocking `FDAAPIClient` extract with
+`AsyncFDAClient.iter_pages`: time to the first flattened page and to the
+full extract
+
+Usage:
+    python benchmarks/bench_async_fetch.py --records 5000 --latency 0.2 --in-flight 4
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from utils.async_client import AsyncFDAClient
+from utils.fda_api import FDAAPIClient
+from synthetic import make_raw_records
+
+
+def make_handler(records: list, latency: float):
+    class FakeOpenFDA(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            query = parse_qs(urlsplit(self.path).query)
+            skip = int(query.get('skip', [0])[0])
+            limit = int(query.get('limit', [100])[0])
+            time.sleep(latency)
+            body = json.dumps({
+                'meta': {'last_updated': '2026-01-01', 'results': {'skip': skip, 'limit': limit, 'total': len(records)}},
+                'results': records[skip:skip + limit],
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeOpenFDA
+
+
+def make_client(port: int) -> FDAAPIClient:
+    client = FDAAPIClient()
+    client.BASE_URL = f'http://127.0.0.1:{port}/drug/event.json'
+    return client
+
+
+def run_sync(port: int, limit: int):
+    start = time.perf_counter()
+    df = make_client(port).fetch_adverse_events(limit=limit)
+    elapsed = time.perf_counter() - start
+    # Nothing is usable until the whole extract returns
+    return elapsed, elapsed, len(df)
+
+
+async def run_async(port: int, limit: int, in_flight: int):
+    start = time.perf_counter()
+    first, rows = None, 0
+    async with AsyncFDAClient(make_client(port), max_in_flight=in_flight) as client:
+        async for page in client.iter_pages(limit=limit):
+            first = first or time.perf_counter() - start
+            rows += len(page)
+    return first, time.perf_counter() - start, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=5_000)
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds added to every response')
+    parser.add_argument('--in-flight', type=int, nargs='*', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    records = make_raw_records(args.records * 4)[:args.records]
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(records, args.latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    print(f"{len(records):,} records, {args.latency * 1000:.0f} ms per request\n")
+    print(f"{'client':<14}{'first page s':>14}{'total s':>10}{'rows':>10}")
+    first, total, rows = run_sync(port, len(records))
+    print(f"{'sync':<14}{first:>14.2f}{total:>10.2f}{rows:>10,}")
+    for in_flight in args.in_flight:
+        first, total, rows = asyncio.run(run_async(port, len(records), in_flight))
+        print(f"{f'async x{in_flight}':<14}{first:>14.2f}{total:>10.2f}{rows:>10,}")
+
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Common-Values Benchmark
+Times the legacy per-group lambda for `common_indications` against the
+vectorized `top_k_by_group`, and the same top-k applied to reactions
+
+Usage:
+    python benchmarks/bench_top_k.py --rows 100000 300000 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from utils.transform import join_top_k, top_k_by_group
+from synthetic import make_events
+
+
+def legacy_indications(df):
+    """The original gold-layer aggregation: first 5 unique values in row order"""
+    return df.groupby('drug_name').agg({
+        'drug_indication': lambda x: '|'.join([str(i) for i in x.dropna().unique()[:5]])
+    })
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='*', default=[100_000, 300_000, 1_000_000])
+    parser.add_argument('--drugs', type=int, default=5_000)
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'lambda':>10}{'top-k':>10}{'speedup':>9}{'reactions':>11}")
+    for rows in args.rows:
+        df = make_events(rows, n_drugs=args.drugs).drop_duplicates(['drug_name', 'safetyreportid'])
+
+        legacy = timed(lambda: legacy_indications(df))
+        vectorized = timed(lambda: join_top_k(
+            top_k_by_group(df, 'drug_name', 'drug_indication', args.k), 'drug_name', 'drug_indication'
+        ))
+        reactions = timed(lambda: join_top_k(
+            top_k_by_group(df, 'drug_name', 'reactions', args.k, sep='|'), 'drug_name', 'reactions'
+        ))
+        print(f"{rows:>10,}{legacy:>9.2f}s{vectorized:>9.2f}s{legacy / vectorized:>8.1f}x{reactions:>10.2f}s")
+
+
+if __name__ == '__main__':
+    main()
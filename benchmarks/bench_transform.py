@@ -0,0 +1,55 @@
+"""
+Transform Scaling Benchmark
+Times the serial transform against the partitioned process-pool mode
+for 1..N workers and checks the outputs are identical
+
+Usage:
+    python benchmarks/bench_transform.py --rows 300000 --max-workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from utils.transform import build_drug_profile, build_silver, transform_partitioned
+from synthetic import make_events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=300_000)
+    parser.add_argument('--drugs', type=int, default=5_000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    df = make_events(args.rows, n_drugs=args.drugs)
+    print(f"{len(df):,} rows, {df['drug_name'].nunique():,} drugs")
+
+    start = time.perf_counter()
+    events = build_silver(df)
+    serial = {'events': events, 'drug_risk_profile': build_drug_profile(events)}
+    serial_time = time.perf_counter() - start
+    print(f"{'serial':>10}  {serial_time:7.2f}s")
+
+    workers = 1
+    while workers <= args.max_workers:
+        start = time.perf_counter()
+        parallel = transform_partitioned(df, workers)
+        elapsed = time.perf_counter() - start
+
+        for name in ('events', 'drug_risk_profile'):
+            pd.testing.assert_frame_equal(serial[name], parallel[name])
+
+        print(f"{workers:>3} workers  {elapsed:7.2f}s  speedup {serial_time / elapsed:4.2f}x  (identical)")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
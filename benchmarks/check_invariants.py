@@ -0,0 +1,197 @@
+"""
+Invariant Checks
+Assertion-based checks of behaviour the benchmarks take for granted,
+run on synthetic data: serious-rate confidence bounds, normalized API
+lookups, rejection of malformed requests, per-encoding ETags and the
+size of the sparse trend tables. Exits non-zero if any check fails
+
+Usage:
+    python benchmarks/check_invariants.py --rows 100000
+"""
+
+import argparse
+import http.client
+import json
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from utils.api import make_server
+from utils.marts import build_view_tables
+from utils.snapshot import publish_snapshot
+from utils.transform import transform, wilson_interval
+from utils.trends import HISTORY_BUCKETS, TrendStore, trend_frames
+from synthetic import make_events
+
+RAW_NAME = 'Drug00000  extended "XR"'  # as openFDA may spell it
+
+
+def check_rate_bounds(rows: int, drugs: int):
+    """FAERS serious '2' means not serious, and every rate CI lies in [0, 100]%"""
+    raw = make_events(rows, n_drugs=drugs)
+    frames = transform(raw)
+    events, profile = frames['events'], frames['drug_risk_profile']
+
+    assert set(events['is_serious'].unique()) <= {0, 1}, 'is_serious must be 0/1'
+    expected = (raw.drop_duplicates('safetyreportid')['serious'] == '1').sum()
+    counted = events.drop_duplicates('safetyreportid')['is_serious'].sum()
+    assert counted == expected, f'{counted} serious reports counted, {expected} coded serious'
+
+    for rate in ('serious_event_rate', 'fatality_rate'):
+        low, value, high = (profile[f'{rate}_ci_low'], profile[rate], profile[f'{rate}_ci_high'])
+        assert not (low.isna().any() or high.isna().any()), f'{rate} CI has NaN'
+        assert ((0 <= low) & (low <= value + 1e-9) & (value <= high + 1e-9) & (high <= 100)).all(), \
+            f'{rate} outside 0 <= low <= rate <= high <= 100'
+
+    low, high = wilson_interval([5, -1, 12], [10, 10, 10])
+    assert ((0 <= low) & (low <= high) & (high <= 1)).all(), 'wilson_interval must clip out-of-range counts'
+    return f'{len(profile):,} drugs'
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str, body: bytes = None, **headers):
+    if body is not None:
+        headers['Content-Type'] = 'application/json'
+    conn.request(method, path, body=body, headers={k.replace('_', '-'): v for k, v in headers.items()})
+    response = conn.getresponse()
+    return response.status, response.read(), response.headers
+
+
+def check_api(rows: int, drugs: int):
+    """
+    Lookups match any spelling of a name, malformed POST bodies and search
+    limits get 400 without breaking keep-alive, and gzip bodies have their
+    own ETag
+    """
+    raw = make_events(rows, n_drugs=drugs)
+    raw['drug_name'] = raw['drug_name'].replace('DRUG00000', RAW_NAME)
+    frames = transform(raw)
+    frames.update(build_view_tables(frames['events'], frames['drug_risk_profile']))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        publish_snapshot(frames, Path(tmp))
+        server = make_server(tmp, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1])
+        try:
+            name = 'DRUG00001'
+            for spelling, expected in ((name, name), (name.lower(), name), (RAW_NAME, RAW_NAME),
+                                       ('drug00000 EXTENDED XR', RAW_NAME)):
+                status, body, _ = request(conn, 'GET', f"/drugs/{quote(spelling, safe='')}")
+                assert status == 200, f'GET /drugs/{spelling!r} returned {status}'
+                assert json.loads(body)['drug_name'] == expected, f'GET /drugs/{spelling!r} returned another drug'
+
+            status, body, _ = request(conn, 'POST', '/drugs', json.dumps({'names': [RAW_NAME, f'  {name.lower()} ']}).encode())
+            result = json.loads(body)
+            assert status == 200 and len(result['results']) == 2 and not result['missing'], \
+                f'POST lookup of unnormalized spellings returned {status} {result}'
+
+            malformed = [b'[]', b'["' + name.encode() + b'"]', b'{"names": "' + name.encode() + b'"}',
+                         b'{"names": [1, 2]}', b'not json', b'"names"']
+            for body in malformed:
+                status, _, _ = request(conn, 'POST', '/drugs', body)
+                assert status == 400, f'POST /drugs {body!r} returned {status}, expected 400'
+
+            for limit in ('0', '-1', '100000', 'ten'):
+                status, _, _ = request(conn, 'GET', f'/search?q=DRUG&limit={limit}')
+                assert status == 400, f'/search limit={limit} returned {status}, expected 400'
+            status, body, _ = request(conn, 'GET', '/search?q=DRUG&limit=5')
+            assert status == 200 and len(json.loads(body)['results']) == 5, f'/search limit=5 returned {status}'
+
+            # gzip and identity bodies are separate representations with their own ETags
+            _, _, plain = request(conn, 'GET', '/views/top_drugs')
+            _, _, packed = request(conn, 'GET', '/views/top_drugs', Accept_Encoding='gzip')
+            assert packed['Content-Encoding'] == 'gzip' and plain['Content-Encoding'] is None, 'gzip not negotiated'
+            assert plain['ETag'] != packed['ETag'], 'gzip and identity bodies share an ETag'
+            assert plain['Vary'] == packed['Vary'] == 'Accept-Encoding', 'missing Vary: Accept-Encoding'
+            status, _, _ = request(conn, 'GET', '/views/top_drugs', If_None_Match=packed['ETag'])
+            assert status == 200, f'gzip ETag revalidated without Accept-Encoding: gzip ({status})'
+            status, _, _ = request(conn, 'GET', '/views/top_drugs', If_None_Match=packed['ETag'], Accept_Encoding='gzip')
+            assert status == 304, f'gzip ETag revalidation returned {status}, expected 304'
+
+            status, _, _ = request(conn, 'POST', '/health', b'{"ignored": true}')
+            assert status == 200, f'POST /health with a body returned {status}'
+            status, _, _ = request(conn, 'GET', f"/drugs/{quote(name, safe='')}")
+            assert status == 200, f'keep-alive request after malformed POSTs returned {status}'
+        finally:
+            conn.close()
+            server.shutdown()
+            server.server_close()
+    return f'{len(malformed)} malformed bodies rejected'
+
+
+def check_trend_size(rows: int, drugs: int, years: int):
+    """Trend tables hold only non-zero cells in the bucket window, however long the history"""
+    events = transform(make_events(rows, n_drugs=drugs))['events']
+    rng = np.random.default_rng(0)
+    report_days = pd.Series(
+        pd.Timestamp('2024-12-31') - pd.to_timedelta(rng.integers(0, 365 * years, events['safetyreportid'].nunique()), 'D'),
+        index=events['safetyreportid'].unique(),
+    )
+    events['receivedate'] = report_days.reindex(events['safetyreportid']).dt.strftime('%Y%m%d').to_numpy()
+
+    # A burst of reports for one drug on the last day must still alert
+    drug = events['drug_name'].value_counts().index[0]
+    spike = events[events['drug_name'] == drug].head(80).copy()
+    spike['safetyreportid'] = [f'SPIKE{i}' for i in range(len(spike))]
+    spike['receivedate'] = '20241231'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TrendStore(tmp)
+        store.update(events)
+        store.update(spike)
+        sizes = {}
+        for freq, buckets in HISTORY_BUCKETS.items():
+            frames = trend_frames(store, freq)
+            trend, alerts = frames[f'trend_{freq}'], frames[f'trend_alerts_{freq}']
+            dense = store.matrix(freq, 'reports', buckets)
+            assert trend['bucket'].nunique() <= buckets, f'{freq}: more than {buckets} buckets published'
+            assert (trend['reports'] > 0).all(), f'{freq}: empty cells published'
+            assert len(trend) == int((dense.to_numpy() > 0).sum()), f'{freq}: rows != non-zero cells in window'
+            assert drug in set(alerts['drug_name']), f'{freq}: spike in {drug} not alerted'
+            sizes[freq] = f'{len(trend):,}/{dense.size:,}'
+    return 'rows/dense cells ' + ', '.join(f'{freq} {size}' for freq, size in sizes.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--drugs', type=int, default=2_000)
+    parser.add_argument('--years', type=int, default=20, help='History spanned by the trend check')
+    args = parser.parse_args()
+
+    checks = [
+        ('serious-rate CI bounds', lambda: check_rate_bounds(args.rows, args.drugs)),
+        ('API lookups and POST validation', lambda: check_api(args.rows, args.drugs)),
+        ('sparse trend output', lambda: check_trend_size(args.rows, args.drugs, args.years)),
+    ]
+    failed = 0
+    for name, check in checks:
+        start = time.perf_counter()
+        try:
+            detail = check()
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL  {name}: {e}")
+        except Exception:
+            failed += 1
+            print(f"ERROR {name}")
+            traceback.print_exc()
+        else:
+            print(f"ok    {name} ({detail}) in {time.perf_counter() - start:.1f}s")
+
+    print(f"\n{len(checks) - failed}/{len(checks)} checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
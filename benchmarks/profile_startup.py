@@ -0,0 +1,117 @@
+"""
+Startup Profiler
+Measures cold-start cost of a fresh dashboard worker: per-module import
+time (via `python -X importtime`) and first-render time per view (via
+Streamlit's AppTest harness). Every measurement runs in a new interpreter
+so nothing is warm.
+
+Usage:
+    python benchmarks/profile_startup.py
+    python benchmarks/profile_startup.py --views "Overview" "Drug Search" --top 15
+    python benchmarks/profile_startup.py --imports-only
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+APP = ROOT / 'streamlit_app_live.py'
+
+# Imported at worker start by the app
+STARTUP_MODULES = ['streamlit', 'pandas', 'utils.fda_api', 'utils.marts', 'utils.assets', 'utils.lazy']
+# Imported on first chart render
+DEFERRED_MODULES = ['plotly.express']
+
+VIEWS = ["Overview", "High Risk Drugs", "Top Drugs", "Demographics", "Trends", "Drug Search", "Report Filter"]
+
+RENDER_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+app, view, timeout = sys.argv[1], sys.argv[2], float(sys.argv[3])
+at = AppTest.from_file(app, default_timeout=timeout)
+at.session_state["view"] = view
+start = time.perf_counter()
+at.run()
+first = time.perf_counter() - start
+print(json.dumps({
+    'seconds': first,
+    'exceptions': [str(e.value) for e in at.exception],
+    # A still-deferred LazyLoader module keeps its proxy class until touched
+    'plotly_loaded': type(sys.modules.get('plotly.express')).__name__ == 'module',
+}))
+"""
+
+
+def profile_imports(modules):
+    """
+    Cumulative import time per top-level module, in a cold interpreter
+
+    Returns:
+        List of (module, cumulative_ms) sorted slowest first, and the total
+    """
+    code = '; '.join(f'import {m}' for m in modules)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # only top-level entries; nested ones are included in their parent
+            timings.append((name.strip(), int(cumulative) / 1000))
+
+    timings.sort(key=lambda t: t[1], reverse=True)
+    return timings, sum(ms for _, ms in timings)
+
+
+def profile_render(view: str, timeout: float):
+    """Time the first run of a view in a fresh interpreter"""
+    proc = subprocess.run(
+        [sys.executable, '-c', RENDER_SCRIPT, str(APP), view, str(timeout)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--views', nargs='*', default=VIEWS)
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to list')
+    parser.add_argument('--timeout', type=float, default=600, help='Per-render timeout in seconds')
+    parser.add_argument('--imports-only', action='store_true')
+    args = parser.parse_args()
+
+    for label, modules in (('Startup imports', STARTUP_MODULES), ('Deferred imports', DEFERRED_MODULES)):
+        timings, total = profile_imports(modules)
+        print(f"\n{label}: {total:,.0f} ms")
+        for name, ms in timings[:args.top]:
+            print(f"  {ms:9,.1f} ms  {name}")
+
+    if args.imports_only:
+        return
+
+    print("\nFirst render (cold worker):")
+    for view in args.views:
+        try:
+            result = profile_render(view, args.timeout)
+        except RuntimeError as e:
+            print(f"  {view:<16} failed: {e}")
+            continue
+        status = 'ok' if not result['exceptions'] else f"errors: {result['exceptions']}"
+        plotly = 'plotly loaded' if result['plotly_loaded'] else 'plotly not loaded'
+        print(f"  {view:<16} {result['seconds'] * 1000:9,.0f} ms  ({plotly}, {status})")
+
+
+if __name__ == '__main__':
+    main()
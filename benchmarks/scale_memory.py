@@ -0,0 +1,113 @@
+"""
+Transform Memory Scale Test
+Runs flatten, silver, gold and the view tables on synthetic raw records at
+several sizes under `MemoryTracker`, reports per-stage peaks and output
+frame sizes, and projects how many reports fit in a RAM budget. Exits 1
+when the pipeline's traced peak per report exceeds the budget, so it can
+gate CI or a container sizing change.
+
+Usage:
+    python benchmarks/scale_memory.py --reports 2000 10000 40000 --budget 6000 --ram 512
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from utils.fda_api import FDAAPIClient
+from utils.marts import build_view_tables
+from utils.memory import MemoryTracker, format_bytes, frame_memory
+from utils.transform import GOLD_INPUT_COLUMNS, build_drug_profile, build_silver
+from synthetic import make_raw_records
+
+# Default ceiling on traced peak bytes per report across the whole pipeline
+BYTES_PER_REPORT_BUDGET = 6_000
+
+
+def run_pipeline_stages(payload: bytes) -> Tuple[MemoryTracker, pd.DataFrame, int]:
+    """
+    Every stage in order, with earlier outputs kept alive as in `run_pipeline`
+
+    Returns:
+        (stage tracker, deep sizes of the output frames, report count)
+    """
+    tracker = MemoryTracker()
+    client = FDAAPIClient()
+    tracemalloc.start()
+    try:
+        with tracker.stage('parse'):
+            # Parsed JSON records, as the fetch accumulates them
+            raw = json.loads(payload)
+        with tracker.stage('flatten'):
+            flat = client._flatten_events(raw)
+        with tracker.stage('silver'):
+            silver = build_silver(flat)
+        with tracker.stage('gold'):
+            profile = build_drug_profile(silver[GOLD_INPUT_COLUMNS])
+        with tracker.stage('views'):
+            views = build_view_tables(silver, profile)
+    finally:
+        tracemalloc.stop()
+    frames = frame_memory({'flattened': flat, 'events': silver, 'drug_risk_profile': profile, **views})
+    return tracker, frames, len(raw)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reports', type=int, nargs='*', default=[2_000, 10_000, 40_000])
+    parser.add_argument('--drugs', type=int, default=2_000)
+    parser.add_argument('--budget', type=float, default=BYTES_PER_REPORT_BUDGET,
+                        help='Maximum traced peak bytes per report')
+    parser.add_argument('--ram', type=float, default=512, help='RAM budget in MB for the capacity projection')
+    args = parser.parse_args()
+
+    sizes, peaks, failed = [], [], []
+    for n_reports in args.reports:
+        # ~3 drug rows per report, as in FAERS
+        records = make_raw_records(n_reports * 4, n_drugs=args.drugs)[:n_reports]
+        payload = json.dumps(records).encode()
+        del records
+        gc.collect()
+        tracker, frames, n_reports = run_pipeline_stages(payload)
+        per_report = tracker.peak / n_reports
+        sizes.append(n_reports)
+        peaks.append(tracker.peak)
+
+        print(f"\n== {n_reports:,} reports: peak {format_bytes(tracker.peak)}, "
+              f"{per_report:,.0f} B/report (budget {args.budget:,.0f})")
+        stages = tracker.report()
+        print(f"{'stage':<10}{'seconds':>9}{'stage peak':>14}{'live peak':>14}{'retained':>14}{'RSS after':>14}")
+        for _, s in stages.iterrows():
+            print(f"{s['stage']:<10}{s['seconds']:>9.2f}{format_bytes(s['traced_peak']):>14}"
+                  f"{format_bytes(s['traced_live_peak']):>14}{format_bytes(s['traced_retained']):>14}"
+                  f"{format_bytes(s['rss_after']):>14}")
+        print(f"{'frame':<24}{'rows':>10}{'deep size':>14}{'B/row':>10}  largest column")
+        for _, f in frames[frames['rows'] > 0].iterrows():
+            print(f"{f['frame']:<24}{f['rows']:>10,}{format_bytes(f['bytes']):>14}{f['bytes_per_row']:>10,.0f}  {f['largest_column']}")
+        if per_report > args.budget:
+            failed.append(n_reports)
+
+    if len(sizes) >= 2:
+        slope, intercept = np.polyfit(sizes, peaks, 1)
+        capacity = (args.ram * 1024 ** 2 - intercept) / slope
+        print(f"\nPeak ≈ {format_bytes(intercept)} + {slope:,.0f} B × reports; "
+              f"~{capacity:,.0f} reports fit in {args.ram:,.0f} MB of traced memory")
+
+    if failed:
+        print(f"\nFAIL: over {args.budget:,.0f} B/report at {', '.join(f'{n:,}' for n in failed)} reports")
+        sys.exit(1)
+    print("\nOK: every size within budget")
+
+
+if __name__ == '__main__':
+    main()
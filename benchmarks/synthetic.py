@@ -0,0 +1,107 @@
+"""
+Synthetic FAERS-shaped data for benchmarks
+Produces frames with the same columns as FDAAPIClient._flatten_events
+"""
+
+import numpy as np
+import pandas as pd
+
+REACTIONS = [
+    'NAUSEA', 'HEADACHE', 'DIZZINESS', 'FATIGUE', 'RASH', 'VOMITING', 'DIARRHOEA',
+    'DYSPNOEA', 'PYREXIA', 'PRURITUS', 'ARTHRALGIA', 'DRUG INEFFECTIVE', 'DEATH',
+    'PNEUMONIA', 'HYPOTENSION', 'ANXIETY', 'INSOMNIA', 'MALAISE', 'PAIN', 'FALL',
+]
+
+INDICATIONS = [
+    'HYPERTENSION', 'DIABETES MELLITUS', 'RHEUMATOID ARTHRITIS', 'DEPRESSION',
+    'PAIN', 'HYPERCHOLESTEROLAEMIA', 'ASTHMA', 'PSORIASIS', 'BREAST CANCER',
+    'MULTIPLE SCLEROSIS', 'PRODUCT USED FOR UNKNOWN INDICATION', 'EPILEPSY',
+]
+
+
+def make_events(n_rows: int, n_drugs: int = 2000, drugs_per_report: float = 3.0, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a flattened events frame with roughly Zipf-distributed drugs
+
+    Args:
+        n_rows: Number of (report, drug) rows
+        n_drugs: Size of the drug vocabulary
+        drugs_per_report: Mean rows per report
+        seed: RNG seed for reproducibility
+    """
+    rng = np.random.default_rng(seed)
+    n_reports = max(1, int(n_rows / drugs_per_report))
+
+    report_idx = np.sort(rng.integers(0, n_reports, n_rows))
+    drug_idx = np.minimum(rng.zipf(1.3, n_rows) - 1, n_drugs - 1)
+
+    serious = rng.choice(['1', '2'], n_reports, p=[0.6, 0.4])
+    death = np.where(rng.random(n_reports) < 0.08, '1', None)
+    life = np.where(rng.random(n_reports) < 0.05, '1', None)
+    hosp = np.where(rng.random(n_reports) < 0.3, '1', None)
+    age = np.where(rng.random(n_reports) < 0.7, rng.integers(1, 95, n_reports).astype(str), None)
+    age_unit = rng.choice(['801', '802', '800', None], n_reports, p=[0.85, 0.05, 0.05, 0.05])
+    sex = rng.choice(['1', '2', '0', None], n_reports, p=[0.4, 0.5, 0.05, 0.05])
+    start = np.datetime64('2024-01-01')
+    receivedate = (start + rng.integers(0, 366, n_reports).astype('timedelta64[D]')).astype(str)
+    receivedate = np.char.replace(receivedate, '-', '')
+
+    reactions = np.array([
+        '|'.join(rng.choice(REACTIONS, rng.integers(1, 5), replace=False)) for _ in range(n_reports)
+    ], dtype=object)
+
+    drug_names = np.array([f'DRUG{i:05d}' for i in range(n_drugs)], dtype=object)
+    indications = np.array(INDICATIONS, dtype=object)
+    indication = indications[rng.integers(0, len(indications), n_rows)]
+    indication[rng.random(n_rows) < 0.2] = None
+
+    return pd.DataFrame({
+        'safetyreportid': (report_idx + 10_000_000).astype(str),
+        'receivedate': receivedate[report_idx],
+        'receiptdate': receivedate[report_idx],
+        'serious': serious[report_idx],
+        'seriousnessdeath': death[report_idx],
+        'seriousnesslifethreatening': life[report_idx],
+        'seriousnesshospitalization': hosp[report_idx],
+        'patient_age': age[report_idx],
+        'patient_age_unit': age_unit[report_idx],
+        'patient_sex': sex[report_idx],
+        'patient_weight': None,
+        'drug_sequence': np.ones(n_rows, dtype=int),
+        'drug_name': drug_names[drug_idx],
+        'drug_indication': indication,
+        'drug_characterization': '1',
+        'reactions': reactions[report_idx],
+    })
+
+
+def make_raw_records(n_rows: int, **kwargs) -> list:
+    """
+    Nested openFDA-style records (the inverse of `_flatten_events`)
+
+    Takes the same arguments as `make_events`; each report becomes one
+    record with its drugs and reactions under `patient`.
+    """
+    records = []
+    for report_id, rows in make_events(n_rows, **kwargs).groupby('safetyreportid', sort=False):
+        first = rows.iloc[0]
+        records.append({
+            'safetyreportid': report_id,
+            'receivedate': first['receivedate'],
+            'receiptdate': first['receiptdate'],
+            'serious': first['serious'],
+            'seriousnessdeath': first['seriousnessdeath'],
+            'seriousnesslifethreatening': first['seriousnesslifethreatening'],
+            'seriousnesshospitalization': first['seriousnesshospitalization'],
+            'patient': {
+                'patientonsetage': first['patient_age'],
+                'patientonsetageunit': first['patient_age_unit'],
+                'patientsex': first['patient_sex'],
+                'drug': [
+                    {'medicinalproduct': name, 'drugindication': indication, 'drugcharacterization': '1'}
+                    for name, indication in zip(rows['drug_name'], rows['drug_indication'])
+                ],
+                'reaction': [{'reactionmeddrapt': term} for term in first['reactions'].split('|')],
+            },
+        })
+    return records
@@ -0,0 +1,76 @@
+"""
+Precompute Dashboard Marts
+Runs the FDA pipeline headlessly and publishes a new snapshot version of
+the marts and view tables, switching the current pointer atomically.
+Schedule it (e.g. from cron) so no dashboard user ever waits on the ETL.
+
+Usage:
+    python precompute.py
+    python precompute.py --sample
+    python precompute.py --limit 20000 --workers 4
+    FDA_MARTS_DIR=/srv/fda/marts python precompute.py   # dashboard must see the same FDA_MARTS_DIR
+    python precompute.py --limit 20000 --memory   # per-stage peaks and frame sizes
+
+    # crontab: refresh both datasets hourly
+    0 * * * * cd /app && python precompute.py && python precompute.py --sample
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+from utils.marts import CHECKPOINT_DIR, MARTS_DIR, RECORD_LIMIT, marts_root, run_pipeline
+from utils.memory import MemoryTracker, format_bytes, frame_memory
+from utils.snapshot import build_lock, open_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default=str(MARTS_DIR), help='Base directory to publish to (default: FDA_MARTS_DIR, which the dashboard reads)')
+    parser.add_argument('--sample', action='store_true', help='Publish the stratified-sample dataset')
+    parser.add_argument('--limit', type=int, default=RECORD_LIMIT, help='Records to fetch (latest-records mode)')
+    parser.add_argument('--workers', type=int, default=1, help='Transform processes')
+    parser.add_argument('--checkpoint-dir', default=str(CHECKPOINT_DIR), help='Page checkpoints for resumable fetches')
+    parser.add_argument('--memory', action='store_true', help='Trace peak memory per stage (slower)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    root = marts_root(sampled=args.sample, base=args.out)
+    tracker = MemoryTracker() if args.memory else None
+    start = time.perf_counter()
+    try:
+        # Waits for a dashboard process that is rebuilding the same root
+        with build_lock(root):
+            version = run_pipeline(
+                root,
+                sampled=args.sample,
+                record_limit=args.limit,
+                checkpoint_dir=args.checkpoint_dir,
+                workers=args.workers,
+                tracker=tracker,
+            )
+    except Exception as e:
+        # The previous version stays current; exit non-zero so the scheduler notices
+        logging.error(f"Pipeline failed, current snapshot unchanged: {e}")
+        sys.exit(1)
+
+    tables = open_snapshot(root, version)
+    status = tables['events'].attrs.get('fetch_status', {})
+    print(f"Published {version} to {root} in {time.perf_counter() - start:.1f}s")
+    print(f"  events: {len(tables['events']):,} rows, drugs: {len(tables['drug_risk_profile']):,}")
+    if status and not status.get('complete', True):
+        print(f"  partial load: {status['fetched']:,} of {status['expected']:,} records ({status.get('error')})")
+    if tracker:
+        print(f"\n  {'stage':<10}{'seconds':>9}{'stage peak':>14}{'RSS after':>14}")
+        for stage in tracker.stages:
+            print(f"  {stage['stage']:<10}{stage['seconds']:>9.2f}{format_bytes(stage['traced_peak']):>14}"
+                  f"{format_bytes(stage['rss_after']):>14}")
+        print(f"\n  {'table':<28}{'rows':>10}{'in memory':>14}")
+        for _, row in frame_memory({'events': tables['events'], 'drug_risk_profile': tables['drug_risk_profile']}).iterrows():
+            print(f"  {row['frame']:<28}{row['rows']:>10,}{format_bytes(row['bytes']):>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,15 +6,39 @@ Live FDA API Connection
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import logging
+import math
 import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import cached_property, partial
 from pathlib import Path
 
 # Add utils to path
 sys.path.append(str(Path(__file__).parent))
 
-from utils.fda_api import FDAAPIClient
+from utils.assets import dashboard_css
+from utils.bitmap_index import OUTCOME_FLAGS, Bitmap, ReportIndex
+from utils.drug_cache import PREFETCH_REQUESTS_PER_MINUTE, DrugDetailCache, load_drug_detail
+from utils.fda_api import FDAAPIClient, normalize_drug_name
+from utils.lake import EventLake
+from utils.marts import (
+    CHECKPOINT_DIR, LAKE_DIR, MARTS_VERSION, RECORD_LIMIT, SAMPLE_DAYS, SAMPLE_TARGET_HALF_WIDTH, TOP_DRUGS_N,
+    marts_root, run_pipeline,
+)
+from utils.sampling import sample_status_summary
+from utils.figures import build_measured, reduce_payload
+from utils.sketches import EventSketches
+from utils.snapshot import build_lock, current_version, open_snapshot, snapshot_age
+from utils.trends import ALERT_LOOKBACK, FREQUENCIES
+from utils.lazy import lazy_import
+
+# Plotly is imported on first chart render, not at worker start
+px = lazy_import("plotly.express")
+pio = lazy_import("plotly.io")
+
+logger = logging.getLogger(__name__)
 
 # -------------------------
 # Page config
@@ -29,204 +53,7 @@ st.set_page_config(
 # -------------------------
 # Modern CSS styling (PRESERVED)
 # -------------------------
-st.markdown("""
-<style>
-    /* Import modern font */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
-    
-    /* Global styles */
-    * {
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Hide default Streamlit elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* Main container with smoother gradient */
-    .main {
-        background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%);
-    }
-    
-    /* Content width limiter */
-    .main .block-container {
-        max-width: 1200px;
-        padding: 1rem 2rem 4rem 2rem;
-    }
-    
-    /* Custom header with refined styling */
-    .custom-header {
-        background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%);
-        padding: 1.5rem 2rem;
-        border-radius: 24px;
-        margin-bottom: 1.5rem;
-        box-shadow: 0 20px 50px rgba(59, 130, 246, 0.15);
-        border: 1px solid rgba(255, 255, 255, 0.1);
-    }
-    
-    .custom-header h1 {
-        color: white;
-        font-size: 2.75rem;
-        font-weight: 800;
-        margin: 0;
-        letter-spacing: -1.5px;
-        text-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);
-    }
-    
-    .custom-header p {
-        color: rgba(255, 255, 255, 0.95);
-        font-size: 1rem;
-        margin-top: 0.5rem;
-        font-weight: 400;
-        letter-spacing: 0.2px;
-    }
-    
-    /* Enhanced metric cards */
-    .metric-card {
-        background: white;
-        padding: 1.25rem 1.5rem;
-        border-radius: 20px;
-        box-shadow: 0 2px 6px rgba(0, 0, 0, 0.08);
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        border: 1px solid #f1f5f9;
-        height: 100%;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .metric-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 4px;
-        background: linear-gradient(90deg, #3b82f6 0%, #60a5fa 100%);
-        transform: scaleX(0);
-        transition: transform 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-    }
-    
-    .metric-card:hover {
-        transform: translateY(-8px);
-        box-shadow: 0 20px 40px rgba(0, 0, 0, 0.08);
-        border-color: #dbeafe;
-    }
-    
-    .metric-card:hover::before {
-        transform: scaleX(1);
-    }
-    
-    .metric-label {
-        font-size: 0.8rem;
-        font-weight: 600;
-        color: #64748b;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        margin-bottom: 0.75rem;
-    }
-    
-    .metric-value {
-        font-size: 2.25rem;
-        font-weight: 800;
-        background: linear-gradient(135deg, #3b82f6 0%, #60a5fa 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        line-height: 1.1;
-        margin: 0.25rem 0;
-    }
-    
-    .metric-delta {
-        font-size: 0.875rem;
-        color: #64748b;
-        font-weight: 500;
-        margin-top: 0.5rem;
-    }
-    
-    /* Refined section headers */
-    .section-header {
-        font-size: 2rem;
-        font-weight: 800;
-        color: #0f172a;
-        margin: 1.5rem 0 1rem 0;
-        padding-bottom: 0.75rem;
-        border-bottom: 3px solid #3b82f6;
-        display: inline-block;
-        letter-spacing: -0.5px;
-    }
-    
-    .section-subheader {
-        font-size: 1.125rem;
-        font-weight: 400;
-        color: #64748b;
-        margin-bottom: 2rem;
-        margin-top: 0.5rem;
-        line-height: 1.6;
-    }
-    
-    /* Sidebar with enhanced gradient */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(180deg, #3b82f6 0%, #2563eb 100%);
-        border-right: 1px solid rgba(255, 255, 255, 0.1);
-    }
-    
-    [data-testid="stSidebar"] * {
-        color: white !important;
-    }
-    
-    /* Enhanced info boxes */
-    .info-box {
-        background: linear-gradient(135deg, #dbeafe 0%, #bfdbfe 100%);
-        padding: 2rem;
-        border-radius: 16px;
-        border-left: 5px solid #3b82f6;
-        margin: 2rem 0;
-        box-shadow: 0 2px 8px rgba(59, 130, 246, 0.08);
-    }
-    
-    .info-box-title {
-        font-weight: 700;
-        font-size: 1.1rem;
-        color: #1e40af;
-        margin-bottom: 0.75rem;
-        letter-spacing: 0.2px;
-    }
-    
-    .info-box-text {
-        color: #1e3a8a;
-        line-height: 1.7;
-        font-size: 1rem;
-    }
-    
-    /* Alert boxes */
-    .alert-error {
-        background: linear-gradient(135deg, #fee2e2 0%, #fecaca 100%);
-        border-left: 5px solid #dc2626;
-        padding: 1.5rem;
-        border-radius: 12px;
-        margin: 1rem 0;
-    }
-    
-    .alert-warning {
-        background: linear-gradient(135deg, #fef3c7 0%, #fde68a 100%);
-        border-left: 5px solid #f59e0b;
-        padding: 1.5rem;
-        border-radius: 12px;
-        margin: 1rem 0;
-    }
-    
-    /* Plot containers */
-    [data-testid="stPlotlyChart"] {
-        background: white;
-        padding: 1.5rem;
-        border-radius: 16px;
-        border: 2px solid #e5e7eb;
-        box-shadow: 0 2px 6px rgba(0, 0, 0, 0.08);
-        margin: 0.5rem 0;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(dashboard_css(), unsafe_allow_html=True)
 
 # -------------------------
 # Helpers
@@ -253,7 +80,7 @@ def normalize_risk_labels(df: pd.DataFrame, col: str = "risk_classification") ->
 
 
 def donut_chart(df: pd.DataFrame, values: str, names: str, title: str, height: int = 400):
-    fig = px.pie(df, values=values, names=names, hole=0.4)
+    fig = px.pie(reduce_payload(df), values=values, names=names, hole=0.4)
     fig.update_layout(
         height=height,
         title="",
@@ -268,109 +95,477 @@ def donut_chart(df: pd.DataFrame, values: str, names: str, title: str, height: i
 # -------------------------
 # Data loading with FDA API
 # -------------------------
-@st.cache_data(ttl=3600, show_spinner="Fetching live data from FDA API...")
-def load_fda_data(record_limit: int = 5000, cache_version: int = 10):
+SNAPSHOT_TTL = 3600  # seconds
+REFRESH_RETRY_INTERVAL = 300  # seconds between rebuild attempts while a snapshot stays stale
+CACHE_VERSION = MARTS_VERSION  # Increment MARTS_VERSION to bust the cache when logic changes
+
+# Dataset modes: the most recent records, or a stratified sample sized for precision
+DATASET_LATEST = "Latest records"
+DATASET_SAMPLE = "Stratified sample"
+
+
+def snapshot_root(cache_version: int, mode: str = DATASET_LATEST) -> Path:
+    return marts_root(sampled=mode == DATASET_SAMPLE, version=cache_version)
+
+
+def build_snapshot(record_limit: int = RECORD_LIMIT, cache_version: int = CACHE_VERSION,
+                   mode: str = DATASET_LATEST, blocking: bool = True, force: bool = False) -> bool:
+    """
+    Run the FDA API pipeline and publish the result as the current snapshot
+
+    Normally `precompute.py` does this on a schedule; the dashboard only
+    runs it when nothing has been published yet or on an explicit refresh.
+    Builds are serialized across processes by a lock in the snapshot root.
+    Once the lock is held, a snapshot that another process published
+    within the TTL is kept unless `force` is set. With `blocking=False`,
+    returns at once if another process is building.
+
+    Returns:
+        Whether this call built a snapshot
+    """
+    root = snapshot_root(cache_version, mode)
+    with build_lock(root, blocking=blocking) as held:
+        if not held:
+            return False
+        age = snapshot_age(root)
+        if not force and age is not None and age <= SNAPSHOT_TTL:
+            return False
+        run_pipeline(root, sampled=mode == DATASET_SAMPLE, record_limit=record_limit)
+        return True
+
+
+@st.cache_resource
+def refresh_state() -> dict:
+    """Process-wide refresh bookkeeping; module globals are re-created on every rerun"""
+    return {"lock": threading.Lock(), "last_attempt": float("-inf")}
+
+
+def refresh_in_background(record_limit: int, cache_version: int, mode: str):
+    """
+    Rebuild a stale snapshot off the request path
+
+    At most one rebuild runs per process, and attempts are spaced by
+    `REFRESH_RETRY_INTERVAL`, so a failing or skipped rebuild is retried
+    a few minutes later rather than on every rerun or after a full TTL.
     """
-    Load data directly from FDA API
-    Cache for 1 hour to avoid excessive API calls
+    state = refresh_state()
+    if not state["lock"].acquire(blocking=False):
+        return
+    if time.monotonic() - state["last_attempt"] < REFRESH_RETRY_INTERVAL:
+        state["lock"].release()
+        return
+    state["last_attempt"] = time.monotonic()
+
+    def run():
+        try:
+            build_snapshot(record_limit, cache_version, mode, blocking=False)
+        except Exception:
+            logger.exception("Background refresh failed; serving the previous snapshot")
+        finally:
+            state["lock"].release()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+@st.cache_resource(max_entries=4, show_spinner="Loading dashboard data...")
+def open_dataset(root: str, version: str):
+    """Memory-map one published version; a few stay open for sessions mid-rerun"""
+    return open_snapshot(root, version)
+
+
+def load_fda_data(record_limit: int = RECORD_LIMIT, cache_version: int = CACHE_VERSION,
+                  mode: str = DATASET_LATEST):
+    """
+    Open the published marts and view tables
     cache_version: Increment this to bust the cache when logic changes
+
+    The `CURRENT` pointer and the snapshot age are read on every run (two
+    small files), so a version published by any process is picked up on
+    the next rerun, and the opened tables are cached per version.
+
+    Marts are memory-mapped, so every session and server process shares
+    the same read-only pages. No user waits on the ETL: a stale snapshot is
+    served while it is rebuilt in the background, and only a missing one
+    is built inline. The build lock makes one process do each rebuild;
+    others serve the old snapshot, or wait for the first build and open it.
     """
-    client = FDAAPIClient()
-    raw_df = client.fetch_adverse_events(limit=record_limit)
-    transformed = client.transform_to_analytics(raw_df)
-    return transformed
+    root = snapshot_root(cache_version, mode)
+    age = snapshot_age(root)
+    if age is None:
+        with st.spinner("Building dashboard data..."):
+            build_snapshot(record_limit, cache_version, mode)
+    elif age > SNAPSHOT_TTL:
+        refresh_in_background(record_limit, cache_version, mode)
+    return open_dataset(str(root), current_version(root))
+
+
+class DashboardData:
+    """
+    Lazy, memoized access to the dataset for one script run
+
+    Nothing is loaded until the selected view asks for it. View tables are
+    precomputed with the marts, so a rerun only maps what is on screen.
+    """
+
+    @property
+    def mode(self) -> str:
+        return st.session_state.get("dataset_mode", DATASET_LATEST)
+
+    @cached_property
+    def dataset(self):
+        try:
+            return load_fda_data(record_limit=RECORD_LIMIT, cache_version=CACHE_VERSION, mode=self.mode)
+        except Exception as e:
+            st.error(f"Failed to load FDA data: {e}")
+            st.stop()
+
+    @property
+    def version(self) -> str:
+        return self.dataset['version']
+
+    @property
+    def events(self) -> pd.DataFrame:
+        return self.dataset['events']
 
+    @property
+    def drug_risk(self) -> pd.DataFrame:
+        return self.dataset['drug_risk_profile']
 
-# Load data once
-try:
-    data = load_fda_data(record_limit=5000, cache_version=3)
-    events_df = data['events']
-    drug_risk_df = data['drug_risk_profile']
-except Exception as e:
-    st.error(f"Failed to load FDA data: {e}")
-    st.stop()
+    @property
+    def fetch_status(self) -> dict:
+        return self.events.attrs.get('fetch_status', {})
+
+    @property
+    def sample_status(self) -> dict:
+        return self.events.attrs.get('sample_status', {})
+
+    def view(self, name: str) -> pd.DataFrame:
+        """A view table precomputed with the marts (see `utils.marts.build_view_tables`)"""
+        return self.dataset[f'view_{name}']
+
+    def summary(self, name: str) -> pd.Series:
+        """A one-row view table as a Series"""
+        return self.view(name).iloc[0]
+
+    @property
+    def lake(self) -> EventLake:
+        """Month-partitioned history accumulated by every pipeline run for this mode"""
+        return EventLake(snapshot_root(CACHE_VERSION, self.mode) / LAKE_DIR)
+
+    @cached_property
+    def sketches(self):
+        """Streaming sketches published with the snapshot, if any"""
+        state = self.dataset['attachments'].get('sketches')
+        return EventSketches.from_dict(state) if state else None
+
+
+data = DashboardData()
+
+
+# -------------------------
+# Chart rendering
+# -------------------------
+@st.cache_resource(max_entries=64, show_spinner=False)
+def cached_figure(version: str, view: str, chart: str, variant: tuple, _build):
+    """
+    Build a figure's JSON spec once per dataset version and view
+
+    Shared across reruns and sessions; the builder is not hashed, so the
+    (version, view, chart, variant) key must identify the figure.
+    `variant` holds any session state the builder's data depends on.
+    Specs are immutable strings, so no session can alter another's chart
+    through a shared Figure object.
+    """
+    return build_measured(_build)
+
+
+chart_stats = []
+
+
+def render_chart(view: str, chart: str, build, *variant):
+    """Render a cached figure; pass as `variant` every widget value `build` reads"""
+    spec, stats = cached_figure(data.version, view, chart, variant, build)
+    start = time.perf_counter()
+    st.plotly_chart(pio.from_json(spec), use_container_width=True)
+    chart_stats.append({**stats, 'render_ms': (time.perf_counter() - start) * 1000})
+
+
+FILTER_MAX_ROWS = 500  # matching reports listed in the Report Filter view
+
+
+@st.cache_resource(max_entries=2, show_spinner="Indexing reports...")
+def load_report_index(_events_df: pd.DataFrame, version: str) -> ReportIndex:
+    """
+    Reaction/outcome bitmaps, built once per dataset version and shared across sessions
+
+    Only the current version and the one it replaced are kept, so each
+    snapshot refresh frees the index of the version before last.
+    """
+    return ReportIndex(_events_df)
 
 
 # -------------------------
 # Derived analytics functions
 # -------------------------
-def load_overview_stats():
-    stats = {
-        'total_drugs': len(drug_risk_df),
-        'total_events': drug_risk_df['total_adverse_events'].sum(),
-        'serious_events': drug_risk_df['serious_events'].sum(),
-        'deaths': drug_risk_df['death_reports'].sum(),
-        'life_threatening': drug_risk_df['life_threatening_events'].sum(),
-        'hospitalizations': drug_risk_df['hospitalization_events'].sum(),
-        'avg_patient_age': drug_risk_df['avg_patient_age'].mean()
-    }
-    return pd.Series(stats)
+# Frames are passed as `_`-prefixed args so Streamlit keys the cache on the
+# dataset version instead of hashing the frame on every call.
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_drug_trend(_trend_df: pd.DataFrame, version: str, freq: str, drug_name: str) -> pd.DataFrame:
+    """
+    One drug's buckets from the published trend table
 
+    The table only has buckets with reports; the empty ones in the
+    published window are filled back in as zeros so the chart shows gaps.
+    """
+    buckets = pd.date_range(_trend_df["bucket"].min(), _trend_df["bucket"].max(), freq=FREQUENCIES[freq], name="bucket")
+    drug_trend = _trend_df[_trend_df["drug_name"] == drug_name].set_index("bucket").reindex(buckets)
+    drug_trend["drug_name"] = drug_name
+    drug_trend[["reports", "deaths"]] = drug_trend[["reports", "deaths"]].fillna(0)
+    drug_trend["alert"] = drug_trend["alert"].fillna(False).astype(bool)
+    return drug_trend.reset_index()
 
-def load_risk_distribution():
-    return drug_risk_df.groupby('risk_classification').agg({
-        'drug_name': 'count',
-        'total_adverse_events': 'sum',
-        'death_reports': 'sum'
-    }).reset_index().rename(columns={'drug_name': 'drug_count', 'total_adverse_events': 'total_events', 'death_reports': 'deaths'})
 
+@st.cache_data(show_spinner=False)
+def load_top_drugs_approx(_drug_risk_df: pd.DataFrame, version: str, n=20):
+    """
+    Top drugs ranked by the Space-Saving sketch instead of the full profile
 
-def load_top_drugs(n=20):
-    return drug_risk_df.nlargest(n, 'total_adverse_events')
+    Ranking and counts come from the sketch (estimate plus guaranteed lower
+    bound); the remaining metrics are joined from the profile where the
+    drug is present in it.
+    """
+    top = data.sketches.top_drugs(n)
+    profile = _drug_risk_df.drop(columns='total_adverse_events')
+    return top.merge(profile, on='drug_name', how='left')
 
 
-def load_high_risk_drugs():
-    high_risk = drug_risk_df[
-        (drug_risk_df['death_reports'] > 0) & 
-        (drug_risk_df['total_adverse_events'] >= 10)
-    ].nlargest(15, 'fatality_rate')
-    return high_risk
+SEARCH_LIVE = "Live FDA query"
+SEARCH_SAMPLE = "Loaded sample"
 
 
-def load_age_analysis():
-    age_df = events_df[events_df['patient_age_years'].notna()].copy()
-    
-    def age_group(age):
-        if age < 18:
-            return 'Pediatric (<18)'
-        elif age < 45:
-            return 'Young Adult (18-44)'
-        elif age < 65:
-            return 'Middle Age (45-64)'
-        else:
-            return 'Senior (65+)'
-    
-    age_df['age_group'] = age_df['patient_age_years'].apply(age_group)
-    
-    result = age_df.groupby('age_group').agg({
-        'drug_name': 'count',
-        'is_serious': 'sum',
-        'is_death': 'sum',
-        'patient_age_years': 'min'
-    }).reset_index()
-    
-    result.columns = ['age_group', 'drug_count', 'total_events', 'deaths', 'min_age']
-    result = result.sort_values('min_age')
-    
-    return result
+@st.cache_resource(show_spinner=False)
+def drug_detail_cache() -> DrugDetailCache:
+    """
+    Per-drug full report sets, shared by every session of this process
+
+    Bounded by bytes and evicted least-recently-used; see `utils.drug_cache`.
+    """
+    loader = partial(load_drug_detail, client=FDAAPIClient(), checkpoint_dir=str(CHECKPOINT_DIR))
+    # Prefetch has its own, slower client so it never holds up an interactive fetch
+    background = FDAAPIClient(requests_per_minute=PREFETCH_REQUESTS_PER_MINUTE)
+    prefetch_loader = partial(load_drug_detail, client=background, checkpoint_dir=str(CHECKPOINT_DIR))
+    return DrugDetailCache(loader, prefetch_loader=prefetch_loader)
+
+
+def load_drug_query(drug_name: str):
+    """
+    Every report for one drug via the openFDA search API
+
+    Returns:
+        (drug risk profile of all drugs on those reports, fetch status)
+    """
+    detail = drug_detail_cache().get(drug_name)
+    return detail['drug_risk_profile'], detail['fetch_status']
+
+
+def load_full_drug_row(drug_name: str, fallback: pd.Series):
+    """
+    One drug's profile over all of its FDA reports
+
+    Returns:
+        (profile row, fetch status); `fallback` and None when the query
+        fails or the drug is missing from its own results
+    """
+    try:
+        profile, status = load_drug_query(drug_name)
+    except Exception:
+        return fallback, None
+    match = profile[profile["drug_name"] == drug_name] if len(profile) else profile
+    if match.empty:
+        return fallback, None
+    return normalize_risk_labels(match).iloc[0], status
+
+
+SEARCH_PAGE_SIZE = 25
+SEARCH_SORTS = {
+    "Total events": ("total_adverse_events", False),
+    "Fatality rate": ("fatality_rate", False),
+    "Serious event rate": ("serious_event_rate", False),
+    "Drug name": ("drug_name", True),
+}
+SEARCH_SUMMARY_COLUMNS = [
+    "drug_name", "risk_label", "total_adverse_events", "death_reports", "fatality_rate", "serious_event_rate",
+]
+
+
+def sort_search_results(results_df: pd.DataFrame, sort_by: str) -> pd.DataFrame:
+    column, ascending = SEARCH_SORTS[sort_by]
+    return results_df.sort_values(column, ascending=ascending, kind="stable")
+
+
+def render_drug_detail(drug: pd.Series):
+    """Metric cards and breakdowns for one drug_risk_profile row"""
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-label">Total Events</div>
+            <div class="metric-value">{int(drug['total_adverse_events']):,}</div>
+        </div>
+        """, unsafe_allow_html=True)
+    with col2:
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-label">Serious Events</div>
+            <div class="metric-value">{int(drug['serious_events']):,}</div>
+        </div>
+        """, unsafe_allow_html=True)
+    with col3:
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-label">Deaths</div>
+            <div class="metric-value">{int(drug['death_reports']):,}</div>
+        </div>
+        """, unsafe_allow_html=True)
+    with col4:
+        avg_age_display = f"{drug['avg_patient_age']:.1f}" if pd.notna(drug["avg_patient_age"]) else "N/A"
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-label">Avg Age</div>
+            <div class="metric-value">{avg_age_display}</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    col1, col2 = st.columns(2, gap="large")
+    with col1:
+        st.markdown("**Safety Metrics**")
+        st.markdown(f"Serious Event Rate: **{drug['serious_event_rate']:.2f}%**")
+        st.markdown(f"Fatality Rate: **{drug['fatality_rate']:.2f}%**")
+        st.markdown(f"Severity Score: **{drug['avg_severity_score']:.2f}** / 5.0")
+
+        if pd.notna(drug["fatality_rate"]):
+            if drug["fatality_rate"] > 10:
+                st.markdown('<div class="alert-error">High fatality rate detected</div>', unsafe_allow_html=True)
+            elif drug["fatality_rate"] > 5:
+                st.markdown('<div class="alert-warning">Elevated fatality rate</div>', unsafe_allow_html=True)
+
+    with col2:
+        st.markdown("**Event Details**")
+        st.markdown(f"Life-Threatening: **{int(drug['life_threatening_events']):,}**")
+        st.markdown(f"Hospitalizations: **{int(drug['hospitalization_events']):,}**")
+        st.markdown(f"Risk Classification: **{drug['risk_label']}**")
+
+    for label, values_col, counts_col in (
+        ("Common Indications", "common_indications", "common_indication_counts"),
+        ("Common Reactions", "common_reactions", "common_reaction_counts"),
+    ):
+        if pd.notna(drug[values_col]) and drug[values_col]:
+            st.markdown("<br>", unsafe_allow_html=True)
+            st.markdown(f"**{label}**")
+            for value, count in zip(drug[values_col].split("|"), drug[counts_col].split("|")):
+                st.markdown(f"- {value.strip()} ({int(count):,} reports)")
+
+
+PAIR_COLUMNS = ["co_drug", "reports", "co_share", "deaths", "fatality_rate", "lift"]
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def load_drug_pairs(_pairs_df: pd.DataFrame, version: str, drug_name: str) -> pd.DataFrame:
+    """One drug's most frequent co-reported drugs from the published pair table"""
+    return _pairs_df.loc[_pairs_df["drug_name"] == drug_name, PAIR_COLUMNS].reset_index(drop=True)
+
+
+def render_drug_pairs(drug_name: str):
+    """Drugs most often reported alongside one drug"""
+    pairs = load_drug_pairs(data.dataset["drug_pairs"], data.version, drug_name)
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown("**Co-reported Drugs**")
+    if pairs.empty:
+        st.caption("No drug appears on enough of the same reports")
+        return
+    st.dataframe(
+        pairs,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "co_drug": st.column_config.TextColumn("Drug"),
+            "reports": st.column_config.NumberColumn("Shared Reports", format="%d"),
+            "co_share": st.column_config.NumberColumn(f"Share of {drug_name} Reports", format="%.1f%%"),
+            "deaths": st.column_config.NumberColumn("Deaths", format="%d"),
+            "fatality_rate": st.column_config.NumberColumn("Fatality Rate", format="%.2f%%"),
+            "lift": st.column_config.NumberColumn("Lift", format="%.1f", help="Shared reports over the count expected if the two drugs were reported independently"),
+        },
+    )
 
 
-def load_event_details():
-    return events_df.groupby('patient_sex_name').agg({
-        'safetyreportid': 'count',
-        'is_serious': 'sum',
-        'is_death': 'sum',
-        'patient_age_years': 'mean'
-    }).reset_index().rename(columns={
-        'safetyreportid': 'event_count',
-        'is_serious': 'serious_count',
-        'is_death': 'death_count',
-        'patient_sex_name': 'patient_sex',
-        'patient_age_years': 'avg_age'
-    })
+HISTORY_COLUMNS = ["total_adverse_events", "serious_events", "death_reports", "fatality_rate"]
 
 
-def search_drug(drug_name: str):
+@st.cache_data(max_entries=128, show_spinner=False)
+def load_drug_history(drug_name: str, version: str, mode: str, date_from=None, date_to=None):
+    """
+    One drug's monthly profile and its profile over a date range, read from
+    the event lake (only that drug's row groups and the needed columns)
+    """
+    lake = data.lake
+    monthly = lake.monthly_profile([drug_name], HISTORY_COLUMNS)
+    ranged = lake.drug_profile([drug_name], date_from, date_to)
+    return monthly, ranged
+
+
+def render_drug_history(drug_name: str):
+    """Monthly report history and a date-range profile for one drug"""
+    months = data.lake.months()
+    if not months:
+        return
+    first = datetime.strptime(months[0], "%Y%m").date()
+    last = (datetime.strptime(months[-1], "%Y%m") + timedelta(days=31)).replace(day=1).date() - timedelta(days=1)
+
+    with st.expander(f"History ({len(months)} months stored)"):
+        date_range = st.date_input(
+            "Received between", (first, last), min_value=first, max_value=last, key=f"history_range_{drug_name}",
+        )
+        # A range picker returns a single date until the end is chosen
+        date_from, date_to = date_range if len(date_range) == 2 else (date_range[0], last)
+        monthly, ranged = load_drug_history(drug_name, data.version, data.mode, date_from, date_to)
+
+        if len(ranged):
+            row = ranged.iloc[0]
+            scan = ranged.attrs["lake_scan"]
+            st.markdown(
+                f"**{date_from:%b %d, %Y} – {date_to:%b %d, %Y}:** {int(row['total_adverse_events']):,} reports, "
+                f"{int(row['death_reports']):,} deaths, fatality rate {row['fatality_rate']:.2f}%"
+            )
+            st.caption(f"Read {scan['files_read']} of {scan['files_total']} month partitions, {len(scan['columns'])} columns")
+        else:
+            st.caption("No stored reports in this range")
+
+        if len(monthly) > 1:
+            def build_history():
+                fig = px.bar(
+                    reduce_payload(monthly),
+                    x="month",
+                    y="total_adverse_events",
+                    color="fatality_rate",
+                    color_continuous_scale="Reds",
+                    labels={"month": "", "total_adverse_events": "Reports", "fatality_rate": "Fatality %"},
+                )
+                fig.update_layout(
+                    height=300,
+                    font=dict(family="Inter"),
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    xaxis=dict(showgrid=False, type="category"),
+                    yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
+                )
+                return fig
+
+            render_chart(view, f"history_{drug_name}", build_history)
+
+
+def search_drug(drug_risk_df: pd.DataFrame, drug_name: str):
     mask = drug_risk_df['drug_name'].str.contains(drug_name, case=False, na=False)
     results = drug_risk_df[mask].sort_values('total_adverse_events', ascending=False)
     
@@ -393,26 +588,69 @@ with st.sidebar:
     st.markdown("## Navigation")
     view = st.radio(
         "Select View",
-        ["Overview", "High Risk Drugs", "Top Drugs", "Demographics", "Drug Search"],
+        ["Overview", "High Risk Drugs", "Top Drugs", "Demographics", "Trends", "Drug Search", "Report Filter"],
         label_visibility="collapsed",
+        key="view",
     )
 
     st.markdown("---")
     st.markdown("### Data Source")
+    st.radio(
+        "Dataset",
+        [DATASET_LATEST, DATASET_SAMPLE],
+        key="dataset_mode",
+        help=f"A stratified sample across the last {SAMPLE_DAYS} days of receivedates, "
+             f"grown until top-drug fatality rates are within ±{SAMPLE_TARGET_HALF_WIDTH:.0%}",
+    )
+    source_stats = data.summary('source_stats')
+    fetch_status = data.fetch_status
     st.markdown(f"""
     **Live FDA API**  
-    Records loaded: {len(events_df):,}  
-    Drugs analyzed: {len(drug_risk_df):,}
+    Records loaded: {source_stats['records']:,}  
+    Drugs analyzed: {source_stats['drugs']:,}
+    
+    Completeness: {fetch_status.get('completeness', 1.0):.0%}
     
     *Cached for 1 hour*
     
     **DEBUG:**  
-    Unique reports: {events_df['safetyreportid'].nunique():,}  
-    Row/Report ratio: {len(events_df)/events_df['safetyreportid'].nunique():.2f}x
+    Unique reports: {source_stats['unique_reports']:,}  
+    Row/Report ratio: {source_stats['rows_per_report']:.2f}x
     """)
     
+    if fetch_status and not fetch_status.get('complete', True):
+        st.warning(
+            f"Partial load: {fetch_status['fetched']:,} of {fetch_status['expected']:,} records. "
+            "Refresh to resume from the last completed page."
+        )
+    if data.sample_status:
+        st.caption(sample_status_summary(data.sample_status))
+
+    use_sketches = st.checkbox(
+        "Approximate metrics (sketches)",
+        key="use_sketches",
+        disabled=data.sketches is None,
+        help="Distinct counts and top drugs from fixed-memory streaming sketches, with error bounds",
+    )
+    if use_sketches:
+        sketch_summary = data.sketches.summary()
+        st.markdown(f"""
+        **Sketch estimates**  
+        Unique reports: ~{sketch_summary['unique_reports']:,.0f} (std. error {sketch_summary['unique_reports_rel_error']:.1%})  
+        Unique patients: ~{sketch_summary['unique_patients']:,.0f} (std. error {sketch_summary['unique_patients_rel_error']:.1%})
+        """)
+
+    # Filled in after the view renders its charts
+    chart_stats_slot = st.empty()
+
     if st.button("ðŸ”„ Refresh Data"):
+        with st.spinner("Fetching live data from FDA API..."):
+            build_snapshot(mode=data.mode, force=True)
+        # Everything below is keyed by dataset version; clearing just frees the
+        # old version. Process-wide state (drug detail cache, refresh lock) stays
         st.cache_data.clear()
+        for cache in (open_dataset, cached_figure, load_report_index):
+            cache.clear()
         st.rerun()
 
     st.markdown("---")
@@ -445,7 +683,7 @@ st.markdown("""
 
 # OVERVIEW VIEW
 if view == "Overview":
-    stats = load_overview_stats()
+    stats = data.summary('overview_stats')
 
     st.markdown('<div class="section-header">Platform Overview</div>', unsafe_allow_html=True)
     st.markdown('<div class="section-subheader">Key metrics from FDA adverse event reporting system</div>', unsafe_allow_html=True)
@@ -561,34 +799,39 @@ if view == "Overview":
 
     with col1:
         st.markdown("#### Risk Classification Distribution")
-        risk_df = normalize_risk_labels(load_risk_distribution())
-
-        fig = px.bar(
-            risk_df,
-            x="risk_label",
-            y="drug_count",
-            color="risk_label",
-            color_discrete_map=RISK_COLOR_MAP,
-            labels={"drug_count": "Number of Drugs", "risk_label": "Risk Level"},
-        )
-        fig.update_layout(
-            showlegend=False, 
-            height=400,
-            title="",
-            font=dict(family="Inter"),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        risk_df = normalize_risk_labels(data.view('risk_distribution'))
+
+        def build_risk_distribution():
+            fig = px.bar(
+                reduce_payload(risk_df),
+                x="risk_label",
+                y="drug_count",
+                color="risk_label",
+                color_discrete_map=RISK_COLOR_MAP,
+                labels={"drug_count": "Number of Drugs", "risk_label": "Risk Level"},
+            )
+            fig.update_layout(
+                showlegend=False, 
+                height=400,
+                title="",
+                font=dict(family="Inter"),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(showgrid=False),
+                yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
+            )
+            return fig
+
+        render_chart(view, "risk_distribution", build_risk_distribution)
 
     with col2:
         st.markdown("#### Demographics by Sex")
-        demo_df = load_event_details()
+        demo_df = data.view('event_details')
+
+        def build_sex_share():
+            return donut_chart(demo_df, values="event_count", names="patient_sex", title="", height=400)
 
-        fig = donut_chart(demo_df, values="event_count", names="patient_sex", title="", height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(view, "sex_share", build_sex_share)
 
     st.markdown("<br><br><br>", unsafe_allow_html=True)
     st.markdown('<div class="section-header" style="font-size: 1.5rem;">Age Group Analysis</div>', unsafe_allow_html=True)
@@ -598,26 +841,29 @@ if view == "Overview":
     
     with col1:
         st.markdown("#### Events by Age Group")
-        age_df = load_age_analysis()
+        age_df = data.view('age_analysis')
         
-        fig = px.bar(
-            age_df,
-            x="age_group",
-            y="total_events",
-            color="deaths",
-            color_continuous_scale="Reds",
-            labels={"total_events": "Total Events", "age_group": "Age Group", "deaths": "Deaths"},
-        )
-        fig.update_layout(
-            height=400,
-            title="",
-            font=dict(family="Inter"),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        def build_age_groups():
+            fig = px.bar(
+                reduce_payload(age_df),
+                x="age_group",
+                y="total_events",
+                color="deaths",
+                color_continuous_scale="Reds",
+                labels={"total_events": "Total Events", "age_group": "Age Group", "deaths": "Deaths"},
+            )
+            fig.update_layout(
+                height=400,
+                title="",
+                font=dict(family="Inter"),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(showgrid=False),
+                yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
+            )
+            return fig
+
+        render_chart(view, "age_groups", build_age_groups)
     
     with col2:
         st.markdown("#### Age Group Details")
@@ -628,30 +874,40 @@ elif view == "High Risk Drugs":
     st.markdown('<div class="section-header">High Fatality Rate Drugs</div>', unsafe_allow_html=True)
     st.markdown('<div class="section-subheader">Drugs with highest percentage of fatal outcomes (minimum 10 events)</div>', unsafe_allow_html=True)
 
-    high_risk_df = normalize_risk_labels(load_high_risk_drugs())
+    high_risk_df = normalize_risk_labels(data.view('high_risk_drugs'))
 
     col1, col2 = st.columns(2, gap="large")
     
     with col1:
-        fig = px.bar(
-            high_risk_df.head(10),
-            x="drug_name",
-            y="fatality_rate",
-            color="death_reports",
-            color_continuous_scale="Reds",
-            labels={"fatality_rate": "Fatality Rate (%)", "drug_name": "Drug", "death_reports": "Deaths"},
-        )
-        fig.update_layout(
-            height=400,
-            title="",
-            xaxis_tickangle=-45,
-            font=dict(family="Inter"),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        def build_fatality_rates():
+            chart_df = high_risk_df.head(10)
+            chart_df = chart_df.assign(
+                ci_plus=chart_df["fatality_rate_ci_high"] - chart_df["fatality_rate"],
+                ci_minus=chart_df["fatality_rate"] - chart_df["fatality_rate_ci_low"],
+            )
+            fig = px.bar(
+                reduce_payload(chart_df),
+                x="drug_name",
+                y="fatality_rate",
+                error_y="ci_plus",
+                error_y_minus="ci_minus",
+                color="death_reports",
+                color_continuous_scale="Reds",
+                labels={"fatality_rate": "Fatality Rate (%)", "drug_name": "Drug", "death_reports": "Deaths"},
+            )
+            fig.update_layout(
+                height=400,
+                title="",
+                xaxis_tickangle=-45,
+                font=dict(family="Inter"),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(showgrid=False),
+                yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
+            )
+            return fig
+
+        render_chart(view, "fatality_rates", build_fatality_rates)
 
     with col2:
         if len(high_risk_df) > 0:
@@ -659,7 +915,7 @@ elif view == "High Risk Drugs":
             st.markdown(f"""
             <div class="alert-error">
                 <strong>Highest Risk: {top_drug['drug_name']}</strong><br>
-                Fatality Rate: {top_drug['fatality_rate']:.1f}%<br>
+                Fatality Rate: {top_drug['fatality_rate']:.1f}% (95% CI {top_drug['fatality_rate_ci_low']:.1f}–{top_drug['fatality_rate_ci_high']:.1f}%)<br>
                 Total Events: {int(top_drug['total_adverse_events']):,}<br>
                 Deaths: {int(top_drug['death_reports']):,}
             </div>
@@ -684,6 +940,8 @@ elif view == "High Risk Drugs":
         height=400,
         column_config={
             "fatality_rate": st.column_config.NumberColumn("Fatality Rate", format="%.2f%%"),
+            "fatality_rate_ci_low": st.column_config.NumberColumn("Fatality 95% CI Low", format="%.2f%%"),
+            "fatality_rate_ci_high": st.column_config.NumberColumn("Fatality 95% CI High", format="%.2f%%"),
             "total_adverse_events": st.column_config.NumberColumn("Total Events", format="%d"),
             "death_reports": st.column_config.NumberColumn("Deaths", format="%d"),
         },
@@ -697,7 +955,14 @@ elif view == "Top Drugs":
     st.markdown('<div class="section-header">Top 20 Drugs by Adverse Event Volume</div>', unsafe_allow_html=True)
     st.markdown('<div class="section-subheader">Most frequently reported adverse events in FAERS database</div>', unsafe_allow_html=True)
 
-    top_drugs_df = normalize_risk_labels(load_top_drugs(20))
+    if use_sketches:
+        top_drugs_df = normalize_risk_labels(load_top_drugs_approx(data.drug_risk, data.version, TOP_DRUGS_N))
+        st.caption(
+            f"Ranked by streaming sketch: counts may overstate by up to "
+            f"{data.sketches.drugs.error_bound:,.0f} reports each (see min_adverse_events for the guaranteed floor)."
+        )
+    else:
+        top_drugs_df = normalize_risk_labels(data.view('top_drugs'))
 
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -726,31 +991,34 @@ elif view == "Top Drugs":
 
     col1, col2 = st.columns([3, 1])
     with col1:
-        fig = px.scatter(
-            top_drugs_df.head(15),
-            x="total_adverse_events",
-            y="serious_event_rate",
-            size="death_reports",
-            color="risk_label",
-            hover_data=["drug_name"],
-            labels={
-                "total_adverse_events": "Total Adverse Events",
-                "serious_event_rate": "Serious Event Rate (%)",
-                "death_reports": "Deaths",
-                "risk_label": "Risk Level",
-            },
-            color_discrete_map=RISK_COLOR_MAP,
-        )
-        fig.update_layout(
-            height=500,
-            title="",
-            font=dict(family="Inter"),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
-            yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        def build_volume_vs_severity():
+            fig = px.scatter(
+                reduce_payload(top_drugs_df.head(15)),
+                x="total_adverse_events",
+                y="serious_event_rate",
+                size="death_reports",
+                color="risk_label",
+                hover_data=["drug_name"],
+                labels={
+                    "total_adverse_events": "Total Adverse Events",
+                    "serious_event_rate": "Serious Event Rate (%)",
+                    "death_reports": "Deaths",
+                    "risk_label": "Risk Level",
+                },
+                color_discrete_map=RISK_COLOR_MAP,
+            )
+            fig.update_layout(
+                height=500,
+                title="",
+                font=dict(family="Inter"),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
+                yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
+            )
+            return fig
+
+        render_chart(view, "volume_vs_severity", build_volume_vs_severity, use_sketches)
 
     with col2:
         st.markdown("#### Legend")
@@ -802,120 +1070,241 @@ elif view == "Demographics":
     st.markdown('<div class="section-header">Patient Demographics Analysis</div>', unsafe_allow_html=True)
     st.markdown('<div class="section-subheader">Adverse events by patient characteristics</div>', unsafe_allow_html=True)
 
-    demo_df = load_event_details()
-    age_df = load_age_analysis()
+    demo_df = data.view('event_details')
+    age_df = data.view('age_analysis')
 
     col1, col2 = st.columns(2, gap="large")
     with col1:
         st.markdown("#### Events by Sex")
-        fig = px.bar(
-            demo_df,
-            x="patient_sex",
-            y="event_count",
-            color="death_count",
-            color_continuous_scale="Reds",
-            labels={"event_count": "Number of Events", "patient_sex": "Sex", "death_count": "Deaths"},
-        )
-        fig.update_layout(
-            height=300,
-            title="",
-            font=dict(family="Inter"),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        def build_sex_events():
+            fig = px.bar(
+                reduce_payload(demo_df),
+                x="patient_sex",
+                y="event_count",
+                color="death_count",
+                color_continuous_scale="Reds",
+                labels={"event_count": "Number of Events", "patient_sex": "Sex", "death_count": "Deaths"},
+            )
+            fig.update_layout(
+                height=300,
+                title="",
+                font=dict(family="Inter"),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(showgrid=False),
+                yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
+            )
+            return fig
+
+        render_chart(view, "sex_events", build_sex_events)
         st.dataframe(demo_df, use_container_width=True, hide_index=True)
 
     with col2:
         st.markdown("#### Events by Age Group")
 
-        fig = donut_chart(age_df, values="total_events", names="age_group", title="", height=300)
-        st.plotly_chart(fig, use_container_width=True)
+        def build_age_share():
+            return donut_chart(age_df, values="total_events", names="age_group", title="", height=300)
+
+        render_chart(view, "age_share", build_age_share)
         st.dataframe(age_df, use_container_width=True, hide_index=True)
 
+# TRENDS VIEW
+elif view == "Trends":
+    st.markdown('<div class="section-header">Report Trends</div>', unsafe_allow_html=True)
+    st.markdown('<div class="section-subheader">Report volume per drug over time, with spikes flagged against rolling and EWMA baselines</div>', unsafe_allow_html=True)
+
+    freq = st.radio("Bucket", list(FREQUENCIES), format_func=str.title, horizontal=True, key="trend_freq")
+    trend_df = data.dataset[f"trend_{freq}"]
+    alerts_df = data.dataset[f"trend_alerts_{freq}"]
+
+    st.markdown(f"#### Current Alerts (last {ALERT_LOOKBACK} {freq} buckets)")
+    if len(alerts_df):
+        st.dataframe(
+            alerts_df[["bucket", "drug_name", "reports", "rolling_mean", "ewma", "z", "deaths", "fatality_rate"]],
+            use_container_width=True,
+            hide_index=True,
+            height=min(400, 38 + 35 * len(alerts_df)),
+            column_config={
+                "bucket": st.column_config.DateColumn("Bucket"),
+                "reports": st.column_config.NumberColumn("Reports", format="%d"),
+                "rolling_mean": st.column_config.NumberColumn("Rolling Mean", format="%.1f"),
+                "ewma": st.column_config.NumberColumn("EWMA", format="%.1f"),
+                "z": st.column_config.NumberColumn("Z-Score", format="%.1f"),
+                "deaths": st.column_config.NumberColumn("Deaths", format="%d"),
+                "fatality_rate": st.column_config.NumberColumn("Fatality Rate", format="%.2f%%"),
+            },
+        )
+        st.download_button("Export Alerts (CSV)", alerts_df.to_csv(index=False), f"trend_alerts_{freq}.csv", "text/csv")
+    else:
+        st.markdown("""
+        <div class="info-box">
+            <div class="info-box-text">No report spikes in the most recent buckets</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    if len(trend_df):
+        # Alerted drugs first, then the highest-volume ones
+        drug_options = list(dict.fromkeys([*alerts_df.get("drug_name", []), *data.view("top_drugs")["drug_name"]]))
+        drug = st.selectbox("Drug", drug_options, key="trend_drug")
+        drug_trend = load_drug_trend(trend_df, data.version, freq, drug)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-label">Reports</div>
+                <div class="metric-value">{int(drug_trend["reports"].sum()):,}</div>
+            </div>
+            """, unsafe_allow_html=True)
+        with col2:
+            st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-label">Latest {freq.title()} Bucket</div>
+                <div class="metric-value">{int(drug_trend["reports"].iloc[-1]) if len(drug_trend) else 0:,}</div>
+            </div>
+            """, unsafe_allow_html=True)
+        with col3:
+            st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-label">Spikes Flagged</div>
+                <div class="metric-value">{int(drug_trend["alert"].sum()):,}</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+        def build_trend():
+            fig = px.line(
+                reduce_payload(drug_trend),
+                x="bucket",
+                y=["reports", "rolling_mean", "ewma"],
+                labels={"bucket": "", "value": "Reports", "variable": ""},
+            )
+            spikes = drug_trend[drug_trend["alert"]]
+            fig.add_scatter(
+                x=spikes["bucket"], y=spikes["reports"], mode="markers", name="spike",
+                marker=dict(color="#dc2626", size=10),
+            )
+            fig.update_layout(
+                height=400,
+                font=dict(family="Inter"),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(showgrid=False),
+                yaxis=dict(showgrid=True, gridcolor='#f3f4f6'),
+            )
+            return fig
+
+        render_chart(view, f"trend_{freq}_{drug}", build_trend)
+
 # DRUG SEARCH VIEW
 elif view == "Drug Search":
     st.markdown('<div class="section-header">Drug Safety Search</div>', unsafe_allow_html=True)
     st.markdown('<div class="section-subheader">Search for specific drugs in the FAERS database</div>', unsafe_allow_html=True)
     
-    search_term = st.text_input("Enter drug name (partial match supported)", placeholder="e.g., LIPITOR, HUMIRA")
+    search_source = st.radio(
+        "Search source",
+        [SEARCH_LIVE, SEARCH_SAMPLE],
+        horizontal=True,
+        label_visibility="collapsed",
+    )
+    if search_source == SEARCH_LIVE:
+        search_label = "Enter drug name (exact product name)"
+    else:
+        search_label = "Enter drug name (partial match supported)"
+    search_term = st.text_input(search_label, placeholder="e.g., LIPITOR, HUMIRA")
+
+    # Keep the drugs users keep opening warm in the shared per-drug cache
+    drug_detail_cache().prefetch_popular()
 
     if search_term:
-        results_df = normalize_risk_labels(search_drug(search_term))
+        if search_source == SEARCH_LIVE:
+            try:
+                with st.spinner(f"Querying FDA API for {normalize_drug_name(search_term)}..."):
+                    live_df, live_status = load_drug_query(normalize_drug_name(search_term))
+            except Exception as e:
+                st.error(f"FDA query failed: {e}")
+                st.stop()
+            results_df = normalize_risk_labels(search_drug(live_df, search_term)) if len(live_df) else live_df
+        else:
+            live_status = None
+            results_df = normalize_risk_labels(search_drug(data.drug_risk, search_term))
 
         if len(results_df) > 0:
+            if live_status:
+                coverage = (
+                    f"Based on {live_status['fetched']:,} of {live_status['available'] or live_status['fetched']:,} FDA reports "
+                    f"mentioning {normalize_drug_name(search_term)}"
+                )
+            else:
+                coverage = f"From the {RECORD_LIMIT:,}-record sample"
+            risk_counts = results_df["risk_label"].value_counts()
+            risk_summary = " · ".join(f"{label}: {count:,}" for label, count in risk_counts.items())
             st.markdown(f"""
             <div class="info-box">
                 <div class="info-box-title">Search Results</div>
                 <div class="info-box-text">
-                Found {len(results_df)} drug(s) matching '{search_term}'
+                Found {len(results_df):,} drug(s) matching '{search_term}'<br>
+                {risk_summary}<br>
+                {coverage}
                 </div>
             </div>
             """, unsafe_allow_html=True)
 
-            for idx, drug in results_df.iterrows():
-                title = f"{drug['drug_name']} - {drug['risk_label']}"
-                with st.expander(title, expanded=(idx == 0)):
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-label">Total Events</div>
-                            <div class="metric-value">{int(drug['total_adverse_events']):,}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    with col2:
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-label">Serious Events</div>
-                            <div class="metric-value">{int(drug['serious_events']):,}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    with col3:
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-label">Deaths</div>
-                            <div class="metric-value">{int(drug['death_reports']):,}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    with col4:
-                        avg_age_display = f"{drug['avg_patient_age']:.1f}" if pd.notna(drug["avg_patient_age"]) else "N/A"
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-label">Avg Age</div>
-                            <div class="metric-value">{avg_age_display}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                    st.markdown("<br>", unsafe_allow_html=True)
-
-                    col1, col2 = st.columns(2, gap="large")
-                    with col1:
-                        st.markdown("**Safety Metrics**")
-                        st.markdown(f"Serious Event Rate: **{drug['serious_event_rate']:.2f}%**")
-                        st.markdown(f"Fatality Rate: **{drug['fatality_rate']:.2f}%**")
-                        st.markdown(f"Severity Score: **{drug['avg_severity_score']:.2f}** / 5.0")
-
-                        if pd.notna(drug["fatality_rate"]):
-                            if drug["fatality_rate"] > 10:
-                                st.markdown('<div class="alert-error">High fatality rate detected</div>', unsafe_allow_html=True)
-                            elif drug["fatality_rate"] > 5:
-                                st.markdown('<div class="alert-warning">Elevated fatality rate</div>', unsafe_allow_html=True)
-
-                    with col2:
-                        st.markdown("**Event Details**")
-                        st.markdown(f"Life-Threatening: **{int(drug['life_threatening_events']):,}**")
-                        st.markdown(f"Hospitalizations: **{int(drug['hospitalization_events']):,}**")
-                        st.markdown(f"Risk Classification: **{drug['risk_label']}**")
-
-                    if pd.notna(drug["common_indications"]) and drug["common_indications"]:
-                        st.markdown("<br>", unsafe_allow_html=True)
-                        st.markdown("**Common Indications**")
-                        indications = drug["common_indications"].split("|")[:5]
-                        for indication in indications:
-                            st.markdown(f"- {indication.strip()}")
+            sort_by = st.selectbox("Sort by", list(SEARCH_SORTS), key="search_sort")
+            sorted_df = sort_search_results(results_df, sort_by)
+
+            n_pages = math.ceil(len(sorted_df) / SEARCH_PAGE_SIZE)
+            page = 1
+            if n_pages > 1:
+                page = st.number_input(
+                    f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1,
+                    key=f"search_page_{search_source}_{normalize_drug_name(search_term)}_{sort_by}",
+                )
+            page_df = sorted_df.iloc[(page - 1) * SEARCH_PAGE_SIZE:page * SEARCH_PAGE_SIZE]
+
+            st.dataframe(
+                page_df[SEARCH_SUMMARY_COLUMNS],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "drug_name": st.column_config.TextColumn("Drug"),
+                    "risk_label": st.column_config.TextColumn("Risk"),
+                    "total_adverse_events": st.column_config.NumberColumn("Total Events", format="%d"),
+                    "death_reports": st.column_config.NumberColumn("Deaths", format="%d"),
+                    "fatality_rate": st.column_config.NumberColumn("Fatality Rate", format="%.2f%%"),
+                    "serious_event_rate": st.column_config.NumberColumn("Serious Rate", format="%.2f%%"),
+                },
+            )
+            st.download_button(
+                f"Export all {len(sorted_df):,} results (CSV)", sorted_df.to_csv(index=False), "drug_search.csv", "text/csv"
+            )
+
+            # Full detail only for a drug the user picks, however many matched:
+            # no default, so a search never blocks on a report-set fetch
+            selected = st.selectbox(
+                "Drug details",
+                page_df["drug_name"].tolist(),
+                index=None,
+                placeholder="Choose a drug to load all its FDA reports",
+                key=f"search_detail_{search_source}_{normalize_drug_name(search_term)}_{sort_by}_{page}",
+            )
+            if selected is None:
+                st.caption("Pick a drug for its full FDA report set, co-reported drugs and history")
+            else:
+                st.markdown(f"#### {selected}")
+                with st.spinner(f"Loading all FDA reports for {selected}..."):
+                    detail_row, detail_status = load_full_drug_row(
+                        selected, page_df[page_df["drug_name"] == selected].iloc[0],
+                    )
+                if detail_status:
+                    st.caption(
+                        f"Based on {detail_status['fetched']:,} of {detail_status['available'] or detail_status['fetched']:,} "
+                        f"FDA reports mentioning {selected}"
+                    )
+                else:
+                    st.caption("Full FDA report set unavailable; showing the figures above")
+                render_drug_detail(detail_row)
+                render_drug_pairs(selected)
+                render_drug_history(selected)
         else:
             st.markdown(f"""
             <div class="alert-warning">
@@ -927,11 +1316,92 @@ elif view == "Drug Search":
         <div class="info-box">
             <div class="info-box-title">How to Search</div>
             <div class="info-box-text">
-            Enter a drug name above to search. Partial matches are supported (e.g., "LIP" will find "LIPITOR").
+            Enter a drug name above to search. Live FDA queries fetch every report for that product
+            directly from the API; the loaded sample supports partial matches (e.g., "LIP" will find "LIPITOR").
             </div>
         </div>
         """, unsafe_allow_html=True)
 
+# REPORT FILTER VIEW
+elif view == "Report Filter":
+    st.markdown('<div class="section-header">Report Filter</div>', unsafe_allow_html=True)
+    st.markdown('<div class="section-subheader">Combine drugs, MedDRA reactions and outcomes to find matching reports</div>', unsafe_allow_html=True)
+
+    report_index = load_report_index(data.events, data.version)
+    reaction_terms = report_index.term_counts('reactions').index.tolist()
+    drug_terms = report_index.term_counts('drugs').index.tolist()
+
+    col1, col2 = st.columns(2, gap="large")
+    with col1:
+        filter_drugs = st.multiselect("Drug (any of)", drug_terms, key="filter_drugs")
+        all_reactions = st.multiselect("Reactions (all of)", reaction_terms, key="filter_all_reactions")
+    with col2:
+        any_reactions = st.multiselect("Reactions (any of)", reaction_terms, key="filter_any_reactions")
+        exclude_reactions = st.multiselect("Exclude reactions", reaction_terms, key="filter_exclude_reactions")
+
+    outcome_cols = st.columns(len(OUTCOME_FLAGS))
+    outcomes = [
+        name for name, col in zip(OUTCOME_FLAGS, outcome_cols)
+        if col.checkbox(name.replace("_", " ").title(), key=f"filter_outcome_{name}")
+    ]
+
+    matched, query_us = report_index.timed_query(
+        drugs=filter_drugs,
+        all_reactions=all_reactions,
+        any_reactions=any_reactions,
+        outcomes=outcomes,
+        exclude_reactions=exclude_reactions,
+    )
+    n_matched = len(matched)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-label">Matching Reports</div>
+            <div class="metric-value">{n_matched:,}</div>
+        </div>
+        """, unsafe_allow_html=True)
+    with col2:
+        share = n_matched / report_index.size * 100 if report_index.size else 0
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-label">Share of Reports</div>
+            <div class="metric-value">{share:.1f}%</div>
+        </div>
+        """, unsafe_allow_html=True)
+    with col3:
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-label">Query Time</div>
+            <div class="metric-value">{query_us:,.0f} µs</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    st.markdown("<br>", unsafe_allow_html=True)
+    if n_matched:
+        # Only the reports on screen are materialized; the export covers the same slice
+        shown = Bitmap.from_ids(matched.to_ids()[:FILTER_MAX_ROWS], report_index.size)
+        matched_rows = data.events.iloc[report_index.rows_for(shown)]
+        report_df = matched_rows.groupby("safetyreportid", sort=False).agg(
+            receivedate=("receivedate", "first"),
+            drugs=("drug_name", lambda names: ", ".join(names.dropna().unique())),
+            reactions=("reactions", "first"),
+            serious=("is_serious", "first"),
+            death=("is_death", "first"),
+            hospitalization=("is_hospitalization", "first"),
+        ).reset_index()
+
+        st.markdown(f"#### Matching Reports (first {len(report_df):,})")
+        st.dataframe(report_df, use_container_width=True, hide_index=True, height=400)
+        st.download_button("Export Matching Reports (CSV)", report_df.to_csv(index=False), "matching_reports.csv", "text/csv")
+    else:
+        st.markdown("""
+        <div class="alert-warning">
+            No reports match all selected conditions
+        </div>
+        """, unsafe_allow_html=True)
+
 # Footer
 st.markdown("<br><br>", unsafe_allow_html=True)
 st.markdown("""
@@ -940,4 +1410,12 @@ st.markdown("""
     FDA Drug Safety Dashboard | Live API Integration | Portfolio Project by Jeffrey Olney
     </div>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+if chart_stats:
+    chart_stats_slot.markdown(f"""
+    **Charts:** {len(chart_stats)}  
+    Payload: {sum(c['bytes'] for c in chart_stats) / 1024:,.1f} KB  
+    Points: {sum(c['points'] for c in chart_stats):,}  
+    Render: {sum(c['render_ms'] for c in chart_stats):,.0f} ms
+    """)
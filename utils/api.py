@@ -0,0 +1,232 @@
+"""
+Drug Risk JSON API
+Read-only HTTP access to the published marts for other services, served
+from an in-memory index of the current snapshot (stdlib only)
+
+Endpoints (all GET unless noted):
+    /health                      Liveness and current snapshot version
+    /drugs/<name>                One drug_risk_profile row
+    /drugs?name=A&name=B         Batch lookup (also comma-separated)
+    POST /drugs                  Batch lookup, body {"names": [...]}
+    /search?q=<text>&limit=20    Drugs whose name contains the text, by volume (limit 1-1000)
+    /views                       Names of the precomputed view tables
+    /views/<name>                One view table (e.g. overview_stats)
+"""
+
+import gzip
+import json
+import logging
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pandas as pd
+
+from .fda_api import normalize_drug_name
+from .snapshot import current_version, open_snapshot
+
+logger = logging.getLogger(__name__)
+
+# How often requests check the CURRENT pointer for a newer snapshot
+RELOAD_INTERVAL = 5.0  # seconds
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 1000
+MAX_BATCH = 1000
+# Responses above this size are gzipped for clients that accept it
+GZIP_MIN_BYTES = 1024
+
+
+def _records(df: pd.DataFrame) -> List[Dict]:
+    """JSON-ready rows; missing values become null"""
+    return json.loads(df.to_json(orient='records'))
+
+
+class DrugIndex:
+    """
+    One snapshot version, indexed for lookups
+
+    Rows are converted to plain dicts once, with each drug's JSON body
+    pre-encoded, so a single-drug request is a dict lookup and a write.
+    Keys are `normalize_drug_name` of the drug name, matching how request
+    names are normalized; if two names normalize alike, the higher-volume
+    row wins.
+    """
+
+    def __init__(self, dataset: Dict):
+        self.version = dataset['version']
+        profile = dataset['drug_risk_profile'].sort_values('total_adverse_events', ascending=False)
+
+        self.rows = {}
+        for row in _records(profile):
+            self.rows.setdefault(normalize_drug_name(row['drug_name']), row)
+        self.encoded = {name: json.dumps(row).encode() for name, row in self.rows.items()}
+        # Names in volume order, for search results that need no re-sort
+        self.names = list(self.rows)
+        self.views = {
+            name[len('view_'):]: _records(df)
+            for name, df in dataset.items() if name.startswith('view_')
+        }
+
+    def lookup(self, names: List[str]) -> Dict:
+        keys = [normalize_drug_name(name) for name in names]
+        return {
+            'version': self.version,
+            'results': {key: self.rows[key] for key in keys if key in self.rows},
+            'missing': [key for key in keys if key not in self.rows],
+        }
+
+    def search(self, text: str, limit: int = SEARCH_LIMIT) -> Dict:
+        text = normalize_drug_name(text)
+        # Plain substring scan: faster than building a pandas mask per request at these sizes
+        matches = [name for name in self.names if text in name]
+        return {
+            'version': self.version,
+            'total': int(len(matches)),
+            'results': [self.rows[name] for name in matches[:limit]],
+        }
+
+
+class SnapshotIndex:
+    """Current `DrugIndex`, swapped in when a newer snapshot is published"""
+
+    def __init__(self, root, reload_interval: float = RELOAD_INTERVAL):
+        self.root = root
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self.index = DrugIndex(open_snapshot(root))
+
+    def get(self) -> DrugIndex:
+        now = time.monotonic()
+        if now - self._checked > self.reload_interval and self._lock.acquire(blocking=False):
+            try:
+                self._checked = now
+                version = current_version(self.root)
+                if version and version != self.index.version:
+                    logger.info(f"Loading snapshot {version}")
+                    self.index = DrugIndex(open_snapshot(self.root, version))
+            finally:
+                self._lock.release()
+        return self.index
+
+
+class DrugAPIHandler(BaseHTTPRequestHandler):
+    """
+    Routes requests against the server's `SnapshotIndex`
+
+    Snapshots are immutable, so the version is a valid ETag for every URL:
+    a client revalidating with If-None-Match gets 304 until a new version
+    is published.
+    """
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACK adds ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _dispatch(self):
+        index = self.server.snapshots.get()
+        # The gzip body is a different representation, so it gets its own validator
+        accepts_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        etag, gzip_etag = f'"{index.version}"', f'"{index.version}-gz"'
+        try:
+            # Read the whole body up front, so a rejected request leaves no
+            # unread bytes on a keep-alive connection
+            self.body = self.rfile.read(int(self.headers.get('Content-Length') or 0)) if self.command == 'POST' else b''
+            status, body = self._route(index)
+        except (ValueError, KeyError) as e:
+            status, body = HTTPStatus.BAD_REQUEST, {'error': str(e)}
+
+        if status == HTTPStatus.OK and self.command == 'GET':
+            cached = self.headers.get('If-None-Match')
+            if cached == etag or (cached == gzip_etag and accepts_gzip):
+                self._send(HTTPStatus.NOT_MODIFIED, b'', cached)
+                return
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        if accepts_gzip and len(payload) >= GZIP_MIN_BYTES:
+            self._send(status, gzip.compress(payload, compresslevel=5), gzip_etag, 'gzip')
+        else:
+            self._send(status, payload, etag)
+
+    def _route(self, index: DrugIndex) -> Tuple[HTTPStatus, object]:
+        url = urlsplit(self.path)
+        parts = [unquote(p) for p in url.path.strip('/').split('/') if p]
+        query = parse_qs(url.query)
+
+        if parts == ['health']:
+            return HTTPStatus.OK, {'status': 'ok', 'version': index.version}
+
+        if parts and parts[0] == 'drugs':
+            if len(parts) == 2:
+                key = normalize_drug_name(parts[1])
+                if key not in index.encoded:
+                    return HTTPStatus.NOT_FOUND, {'error': f'Unknown drug: {key}'}
+                return HTTPStatus.OK, index.encoded[key]
+            names = self._batch_names(query)
+            if not names:
+                raise ValueError('Provide drug names via ?name= or a JSON body {"names": [...]}')
+            if len(names) > MAX_BATCH:
+                raise ValueError(f'At most {MAX_BATCH} names per request')
+            return HTTPStatus.OK, index.lookup(names)
+
+        if parts == ['search']:
+            text = query.get('q', [''])[0]
+            if not text.strip():
+                raise ValueError('Missing search text ?q=')
+            limit = int(query.get('limit', [SEARCH_LIMIT])[0])
+            if not 1 <= limit <= MAX_SEARCH_LIMIT:
+                raise ValueError(f'limit must be between 1 and {MAX_SEARCH_LIMIT}')
+            return HTTPStatus.OK, index.search(text, limit)
+
+        if parts == ['views']:
+            return HTTPStatus.OK, {'version': index.version, 'views': sorted(index.views)}
+
+        if len(parts) == 2 and parts[0] == 'views':
+            if parts[1] not in index.views:
+                return HTTPStatus.NOT_FOUND, {'error': f'Unknown view: {parts[1]}'}
+            return HTTPStatus.OK, {'version': index.version, 'rows': index.views[parts[1]]}
+
+        return HTTPStatus.NOT_FOUND, {'error': f'No route for {url.path}'}
+
+    def _batch_names(self, query: Dict) -> List[str]:
+        if self.command == 'POST':
+            payload = json.loads(self.body or b'{}')
+            names = payload.get('names', []) if isinstance(payload, dict) else None
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                raise ValueError('Body must be a JSON object {"names": [...]} with a list of strings')
+            return names
+        return [name for value in query.get('name', []) for name in value.split(',') if name.strip()]
+
+    def _send(self, status: HTTPStatus, payload: bytes, etag: str, encoding: Optional[str] = None):
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')  # cache, but revalidate with the ETag
+        self.send_header('Vary', 'Accept-Encoding')
+        if status != HTTPStatus.NOT_MODIFIED:
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def make_server(root, host: str = '127.0.0.1', port: int = 8502,
+                reload_interval: float = RELOAD_INTERVAL) -> ThreadingHTTPServer:
+    """Build (but do not start) an API server over the snapshot at `root`"""
+    server = ThreadingHTTPServer((host, port), DrugAPIHandler)
+    server.daemon_threads = True
+    server.snapshots = SnapshotIndex(root, reload_interval)
+    return server
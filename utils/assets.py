@@ -0,0 +1,31 @@
+"""
+Static Assets
+Dashboard CSS, minified once per process
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+
+ASSETS_DIR = Path(__file__).parent.parent / 'assets'
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and insignificant whitespace"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.strip()
+
+
+@lru_cache(maxsize=None)
+def dashboard_css() -> str:
+    """
+    The dashboard stylesheet as a ready-to-inject `<style>` block
+
+    Read and minified on first use; later reruns in the same worker get
+    the cached string.
+    """
+    css = (ASSETS_DIR / 'dashboard.css').read_text()
+    return f'<style>{minify_css(css)}</style>'
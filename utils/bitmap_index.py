@@ -0,0 +1,233 @@
+"""
+Report Bitmap Index
+Dictionary-encodes drugs and MedDRA reaction terms and keeps a compressed
+bitmap of report ordinals per term and per outcome flag, so multi-condition
+filters are bitwise AND/OR/AND-NOT instead of scans over the events frame
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .transform import split_pairs
+
+# Report-level outcome flags indexed from the silver events
+OUTCOME_FLAGS = {
+    'serious': 'is_serious',
+    'death': 'is_death',
+    'life_threatening': 'is_life_threatening',
+    'hospitalization': 'is_hospitalization',
+}
+
+
+class Bitmap:
+    """
+    Set of report ordinals in [0, size), stored sparse or dense
+
+    Sparse bitmaps are sorted uint32 arrays; dense ones are packed uint64
+    words. Whichever is smaller is kept (dense above size / 32 members,
+    the point where 4-byte ids outgrow one bit per report), which is the
+    same trade-off Roaring makes per container, applied to the whole set.
+    """
+
+    __slots__ = ('size', 'ids', 'words')
+
+    def __init__(self, size: int, ids: Optional[np.ndarray] = None, words: Optional[np.ndarray] = None):
+        self.size = size
+        self.ids = ids
+        self.words = words
+
+    @classmethod
+    def from_ids(cls, ids: np.ndarray, size: int) -> 'Bitmap':
+        """Build from sorted, unique ordinals"""
+        ids = np.asarray(ids, dtype=np.uint32)
+        if len(ids) * 32 > size:
+            bits = np.zeros(_word_count(size) * 64, dtype=bool)
+            bits[ids] = True
+            return cls(size, words=_pack(bits))
+        return cls(size, ids=ids)
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray) -> 'Bitmap':
+        mask = np.asarray(mask, dtype=bool)
+        return cls.from_ids(np.flatnonzero(mask), len(mask))
+
+    @classmethod
+    def full(cls, size: int) -> 'Bitmap':
+        return cls.from_ids(np.arange(size, dtype=np.uint32), size)
+
+    @property
+    def is_dense(self) -> bool:
+        return self.words is not None
+
+    def _dense_words(self) -> np.ndarray:
+        if self.is_dense:
+            return self.words
+        bits = np.zeros(_word_count(self.size) * 64, dtype=bool)
+        bits[self.ids] = True
+        return _pack(bits)
+
+    def _contains(self, ids: np.ndarray) -> np.ndarray:
+        """Membership of each ordinal in `ids` (dense bitmaps only)"""
+        return ((self.words[ids >> 6] >> (ids & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def to_ids(self) -> np.ndarray:
+        if not self.is_dense:
+            return self.ids
+        bits = np.unpackbits(self.words.view(np.uint8), bitorder='little')[:self.size]
+        return np.flatnonzero(bits).astype(np.uint32)
+
+    def __len__(self) -> int:
+        if not self.is_dense:
+            return len(self.ids)
+        return int(np.unpackbits(self.words.view(np.uint8)).sum())
+
+    def __and__(self, other: 'Bitmap') -> 'Bitmap':
+        if not self.is_dense and not other.is_dense:
+            return Bitmap.from_ids(np.intersect1d(self.ids, other.ids, assume_unique=True), self.size)
+        if not self.is_dense or not other.is_dense:
+            sparse, dense = (self, other) if not self.is_dense else (other, self)
+            return Bitmap(self.size, ids=sparse.ids[dense._contains(sparse.ids)])
+        return _normalize(Bitmap(self.size, words=self.words & other.words))
+
+    def __or__(self, other: 'Bitmap') -> 'Bitmap':
+        if not self.is_dense and not other.is_dense:
+            return Bitmap.from_ids(np.union1d(self.ids, other.ids), self.size)
+        return Bitmap(self.size, words=self._dense_words() | other._dense_words())
+
+    def __sub__(self, other: 'Bitmap') -> 'Bitmap':
+        if not self.is_dense:
+            if other.is_dense:
+                return Bitmap(self.size, ids=self.ids[~other._contains(self.ids)])
+            return Bitmap(self.size, ids=np.setdiff1d(self.ids, other.ids, assume_unique=True))
+        return _normalize(Bitmap(self.size, words=self.words & ~other._dense_words()))
+
+    @property
+    def nbytes(self) -> int:
+        return self.words.nbytes if self.is_dense else self.ids.nbytes
+
+
+def _word_count(size: int) -> int:
+    return (size + 63) // 64
+
+
+def _pack(bits: np.ndarray) -> np.ndarray:
+    return np.packbits(bits, bitorder='little').view(np.uint64)
+
+
+def _normalize(bitmap: Bitmap) -> Bitmap:
+    """Switch a dense result back to sparse once it is small enough"""
+    count = len(bitmap)
+    if count * 32 > bitmap.size:
+        return bitmap
+    return Bitmap(bitmap.size, ids=bitmap.to_ids())
+
+
+class ReportIndex:
+    """
+    Bitmaps over the reports in a silver events frame
+
+    Reports are numbered 0..n-1 in order of first appearance. Drug names
+    and reaction terms are dictionary-encoded; each term, each drug and
+    each outcome flag maps to the bitmap of reports it occurs in. Rows
+    without a `safetyreportid` belong to no report and are not indexed.
+    """
+
+    def __init__(self, events: pd.DataFrame):
+        codes, report_ids = pd.factorize(events['safetyreportid'])
+        self.report_ids = np.asarray(report_ids, dtype=object)
+        self.size = len(self.report_ids)
+        self.row_reports = codes  # report ordinal of every events row
+
+        self.drugs = self._encode(pd.DataFrame({'report': codes, 'term': events['drug_name'].to_numpy()}))
+
+        # Reactions and outcomes are per report; every drug row repeats them.
+        # Null ids factorize to -1 and must not become an extra report
+        valid = np.flatnonzero(codes >= 0)
+        first = valid[np.unique(codes[valid], return_index=True)[1]]
+        reports = events.iloc[first]
+        ordinals = pd.Series(np.arange(self.size), name='report')
+        self.reactions = self._encode(
+            split_pairs(ordinals, reports['reactions'].reset_index(drop=True).rename('term'), '|')
+        )
+        self.outcomes = {
+            name: Bitmap.from_mask(reports[col].fillna(0).to_numpy(dtype=float) == 1)
+            for name, col in OUTCOME_FLAGS.items()
+        }
+
+    def _encode(self, pairs: pd.DataFrame) -> Dict[str, Bitmap]:
+        """Bitmap per distinct `term` from (report, term) rows"""
+        pairs = pairs[(pairs['report'] >= 0) & pairs['term'].notna() & (pairs['term'] != '')].drop_duplicates()
+
+        term_codes, vocabulary = pd.factorize(pairs['term'], sort=True)
+        order = np.lexsort((pairs['report'].to_numpy(), term_codes))
+        sorted_reports = pairs['report'].to_numpy()[order].astype(np.uint32)
+        bounds = np.searchsorted(term_codes[order], np.arange(len(vocabulary) + 1))
+        return {
+            term: Bitmap.from_ids(sorted_reports[bounds[i]:bounds[i + 1]], self.size)
+            for i, term in enumerate(vocabulary)
+        }
+
+    def term_counts(self, kind: str = 'reactions') -> pd.Series:
+        """Reports per term, most frequent first (for pickers)"""
+        index = getattr(self, kind)
+        return pd.Series({term: len(bitmap) for term, bitmap in index.items()}).sort_values(ascending=False)
+
+    def query(self, drugs: Iterable[str] = (), all_reactions: Iterable[str] = (),
+              any_reactions: Iterable[str] = (), outcomes: Iterable[str] = (),
+              exclude_reactions: Iterable[str] = ()) -> Bitmap:
+        """
+        Reports matching every given condition
+
+        Args:
+            drugs: Report mentions any of these drugs
+            all_reactions: Report has every one of these reactions
+            any_reactions: Report has at least one of these reactions
+            outcomes: Report has every one of these flags (keys of `OUTCOME_FLAGS`)
+            exclude_reactions: Report has none of these reactions
+        """
+        empty = Bitmap(self.size, ids=np.zeros(0, dtype=np.uint32))
+
+        def union(index: Dict[str, Bitmap], terms) -> Bitmap:
+            result = empty
+            for term in terms:
+                result = result | index.get(term, empty)
+            return result
+
+        conditions = [self.outcomes[name] for name in outcomes]
+        conditions += [self.reactions.get(term, empty) for term in all_reactions]
+        if drugs:
+            conditions.append(union(self.drugs, drugs))
+        if any_reactions:
+            conditions.append(union(self.reactions, any_reactions))
+
+        # Smallest first, so intersections shrink as early as possible
+        conditions.sort(key=lambda b: len(b.ids) if not b.is_dense else b.size)
+        result = conditions[0] if conditions else Bitmap.full(self.size)
+        for condition in conditions[1:]:
+            result = result & condition
+        if exclude_reactions:
+            result = result - union(self.reactions, exclude_reactions)
+        return result
+
+    def timed_query(self, **conditions) -> Tuple[Bitmap, float]:
+        """`query` plus its wall time in microseconds"""
+        start = time.perf_counter()
+        result = self.query(**conditions)
+        return result, (time.perf_counter() - start) * 1e6
+
+    def report_ids_for(self, bitmap: Bitmap) -> List:
+        return self.report_ids[bitmap.to_ids()].tolist()
+
+    def rows_for(self, bitmap: Bitmap) -> np.ndarray:
+        """Positions of the events rows belonging to the matched reports"""
+        member = np.zeros(self.size + 1, dtype=bool)  # last slot absorbs missing report ids (-1)
+        member[bitmap.to_ids()] = True
+        return np.flatnonzero(member[self.row_reports])
+
+    @property
+    def nbytes(self) -> int:
+        bitmaps = [*self.drugs.values(), *self.reactions.values(), *self.outcomes.values()]
+        return sum(b.nbytes for b in bitmaps)
@@ -0,0 +1,180 @@
+"""
+Fetch Checkpoints
+Persists completed API pages so an interrupted load can resume
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_MAX_BYTES = 1024 ** 3  # all query checkpoints under one root
+CHECKPOINT_MAX_AGE = 7 * 24 * 3600  # seconds since a checkpoint was last used
+CHECKPOINT_GRACE = 600  # checkpoints used this recently may be mid-fetch and are never pruned
+
+
+def _write_json_atomic(path: Path, payload) -> None:
+    """Write JSON to a temp file and rename it into place"""
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+class FetchCheckpoint:
+    """
+    On-disk record of the pages completed for one paginated query
+
+    Each page is written to its own file before the manifest is updated,
+    so a crash between the two at worst loses the last page. The
+    checkpoint is keyed by the query parameters (minus `limit`/`skip`),
+    which lets a larger `limit` resume a smaller, finished prefix. The
+    `last_updated`/`etag`/`last_modified` validators let a finished
+    checkpoint double as a local copy until openFDA republishes.
+
+    Loading or saving touches the manifest, so its mtime is the last use
+    that `prune_checkpoints` evicts by.
+    """
+
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, root_dir, query: Dict):
+        self.query = {k: v for k, v in query.items() if k not in ('limit', 'skip')}
+        key = hashlib.sha1(json.dumps(self.query, sort_keys=True).encode()).hexdigest()[:16]
+        self.path = Path(root_dir) / key
+        self.pages: List[List[int]] = []  # [skip, record_count] per completed page
+        self.total_available: Optional[int] = None
+        self.last_updated: Optional[str] = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self._load()
+
+    @property
+    def next_skip(self) -> int:
+        """Offset of the first record not yet fetched"""
+        return sum(count for _, count in self.pages)
+
+    def _load(self):
+        manifest_path = self.path / self.MANIFEST_NAME
+        if not manifest_path.exists():
+            return
+
+        try:
+            with open(manifest_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {manifest_path}: {e}")
+            return
+
+        if state.get('query') != self.query:
+            return
+
+        self.pages = state.get('pages', [])
+        self.total_available = state.get('total_available')
+        self.last_updated = state.get('last_updated')
+        self.etag = state.get('etag')
+        self.last_modified = state.get('last_modified')
+        os.utime(manifest_path)
+        logger.info(f"Loaded checkpoint: {self.next_skip} records in {len(self.pages)} pages")
+
+    def save_manifest(self):
+        """Write the page list and validators to disk"""
+        _write_json_atomic(self.path / self.MANIFEST_NAME, {
+            'query': self.query,
+            'pages': self.pages,
+            'total_available': self.total_available,
+            'last_updated': self.last_updated,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'saved_at': time.time(),
+        })
+
+    def add_page(self, skip: int, records: List[Dict], total_available: Optional[int] = None,
+                 last_updated: Optional[str] = None):
+        """Persist one completed page and advance the manifest"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(self.path / f'page_{skip:08d}.json', records)
+        self.pages.append([skip, len(records)])
+        if total_available is not None:
+            self.total_available = total_available
+        if last_updated is not None:
+            self.last_updated = last_updated
+        self.save_manifest()
+
+    def load_records(self) -> List[Dict]:
+        """Read back every completed page in offset order"""
+        records = []
+        for skip, _ in sorted(self.pages):
+            with open(self.path / f'page_{skip:08d}.json') as f:
+                records.extend(json.load(f))
+        return records
+
+    def reset(self):
+        """Discard all completed pages"""
+        self.clear()
+        self.pages = []
+        self.total_available = None
+        self.last_updated = None
+        self.etag = None
+        self.last_modified = None
+
+    def clear(self):
+        """Remove the checkpoint from disk"""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def prune_checkpoints(root_dir, max_bytes: int = CHECKPOINT_MAX_BYTES, max_age: float = CHECKPOINT_MAX_AGE,
+                      grace: float = CHECKPOINT_GRACE) -> int:
+    """
+    Delete query checkpoints unused for `max_age`, then the least recently
+    used ones until the rest fit in `max_bytes`
+
+    Every distinct query (each drug opened in the dashboard, each sampling
+    window) leaves its own checkpoint, so without pruning the root grows
+    with every query ever made. Checkpoints used within `grace` seconds
+    are kept whatever the budget, since a fetch may be writing them.
+
+    Returns:
+        Number of checkpoints removed
+    """
+    root = Path(root_dir)
+    if not root.is_dir():
+        return 0
+
+    now = time.time()
+    entries = []  # (last used, bytes, path)
+    for path in root.iterdir():
+        if not path.is_dir():
+            continue
+        manifest = path / FetchCheckpoint.MANIFEST_NAME
+        try:
+            last_used = (manifest if manifest.exists() else path).stat().st_mtime
+            entries.append((last_used, _dir_bytes(path), path))
+        except OSError:
+            continue  # removed by a concurrent prune
+
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for last_used, size, path in entries:
+        if now - last_used < grace:
+            break
+        if now - last_used <= max_age and total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+
+    if removed:
+        logger.info(f"Pruned {removed} checkpoints from {root}; {total:,} bytes kept")
+    return removed
@@ -0,0 +1,117 @@
+"""
+Drug Co-occurrence
+Pair counts for drugs reported together, from the report x drug
+incidence matrix, as a signal for possible interactions
+"""
+
+import logging
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MIN_PAIR_REPORTS = 3  # pairs seen on fewer reports are dropped
+TOP_PAIRS_PER_DRUG = 10
+
+
+def incidence(events: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Coordinates of the binary report x drug matrix plus per-report outcomes
+
+    Returns:
+        (report codes, drug codes, drug names, death flag per report,
+        serious flag per report); each (report, drug) appears once
+    """
+    events = events[events['drug_name'].notna() & events['safetyreportid'].notna()]
+    report_codes, report_ids = pd.factorize(events['safetyreportid'])
+    first = np.unique(report_codes, return_index=True)[1]
+    death = events['is_death'].to_numpy(dtype=float)[first] == 1
+    serious = events['is_serious'].to_numpy(dtype=float)[first] == 1
+
+    drug_codes, drug_names = pd.factorize(events['drug_name'], sort=True)
+    cells = np.unique(report_codes.astype(np.int64) * len(drug_names) + drug_codes)
+    return cells // len(drug_names), cells % len(drug_names), np.asarray(drug_names, dtype=object), death, serious
+
+
+def _pair_counts(rows, cols, n_drugs, death, serious):
+    """
+    XᵀX, Xᵀ·diag(death)·X and Xᵀ·diag(serious)·X as one product
+
+    The three right-hand matrices are stacked side by side, so a single
+    sparse multiply yields all counts; pairs are then read off the upper
+    triangle of each block.
+    """
+    # Imported here, not at module level: marts (and so the dashboard) import this module at startup
+    import scipy.sparse as sparse
+
+    n_reports = len(death)
+    X = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(n_reports, n_drugs))
+    weighted = sparse.hstack([
+        X,
+        sparse.diags(death.astype(np.int32), dtype=np.int32) @ X,
+        sparse.diags(serious.astype(np.int32), dtype=np.int32) @ X,
+    ]).tocsr()
+    product = (X.T.tocsr() @ weighted).tocoo()  # (n_drugs, 3 * n_drugs)
+
+    block, b = np.divmod(product.col, n_drugs)
+    upper = product.row < b
+    a, b, block, data = product.row[upper], b[upper], block[upper], product.data[upper]
+    keys, inverse = np.unique(a.astype(np.int64) * n_drugs + b, return_inverse=True)
+    counts = np.zeros((3, len(keys)), dtype=np.int64)
+    counts[block, inverse] = data  # the product has one entry per (row, column)
+    return keys // n_drugs, keys % n_drugs, counts[0], counts[1], counts[2]
+
+
+def drug_pairs(events: pd.DataFrame, min_reports: int = MIN_PAIR_REPORTS) -> pd.DataFrame:
+    """
+    Reports, deaths and serious reports for every pair of co-reported drugs
+
+    Args:
+        events: Silver events (one row per report and drug)
+        min_reports: Drop pairs reported together fewer times than this
+
+    Returns:
+        One row per unordered pair (`drug_a` < `drug_b`) with counts, the
+        pair's fatality rate, and lift (observed co-reports over what the
+        two drugs' report counts would give if independent)
+    """
+    rows, cols, names, death, serious = incidence(events)
+    n_drugs = len(names)
+    a, b, reports, deaths, serious_reports = _pair_counts(rows, cols, n_drugs, death, serious)
+
+    keep = reports >= min_reports
+    drug_reports = np.bincount(cols, minlength=n_drugs)
+    pairs = pd.DataFrame({
+        'drug_a': names[a[keep]],
+        'drug_b': names[b[keep]],
+        'reports': reports[keep],
+        'deaths': deaths[keep],
+        'serious_reports': serious_reports[keep],
+        'drug_a_reports': drug_reports[a[keep]],
+        'drug_b_reports': drug_reports[b[keep]],
+    })
+    pairs['fatality_rate'] = pairs['deaths'] / pairs['reports'] * 100
+    pairs['lift'] = pairs['reports'] * len(death) / (pairs['drug_a_reports'] * pairs['drug_b_reports'])
+    logger.info(f"{len(pairs)} drug pairs on at least {min_reports} reports")
+    return pairs.sort_values('reports', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def top_pairs_by_drug(pairs: pd.DataFrame, k: int = TOP_PAIRS_PER_DRUG) -> pd.DataFrame:
+    """
+    Each drug's `k` most frequent co-reported drugs
+
+    Every pair is listed under both of its drugs. `co_share` is the share
+    of the drug's reports that also mention `co_drug`.
+    """
+    shared = ['reports', 'deaths', 'serious_reports', 'fatality_rate', 'lift']
+    both = pd.concat([
+        pairs[['drug_a', 'drug_b', 'drug_a_reports', *shared]].set_axis(['drug_name', 'co_drug', 'drug_reports', *shared], axis=1),
+        pairs[['drug_b', 'drug_a', 'drug_b_reports', *shared]].set_axis(['drug_name', 'co_drug', 'drug_reports', *shared], axis=1),
+    ], ignore_index=True)
+    both['co_share'] = both['reports'] / both['drug_reports'] * 100
+
+    both = both.sort_values(['drug_name', 'reports', 'co_drug'], ascending=[True, False, True], kind='stable')
+    both['rank'] = both.groupby('drug_name').cumcount() + 1
+    return both[both['rank'] <= k].reset_index(drop=True)
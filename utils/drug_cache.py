@@ -0,0 +1,222 @@
+"""
+Drug Detail Cache
+Each drug's full openFDA report set, fetched and transformed on demand,
+held in a byte-bounded LRU shared by every session, with background
+prefetch of the drugs most likely to be opened next
+"""
+
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from .fda_api import FDAAPIClient, normalize_drug_name
+
+logger = logging.getLogger(__name__)
+
+DRUG_QUERY_LIMIT = 5000  # reports fetched per drug
+DETAIL_CACHE_BYTES = 256 * 1024 * 1024
+DETAIL_TTL = 3600  # seconds before a cached drug is refetched (its pages revalidate from checkpoint)
+PREFETCH_TOP_N = 10
+PREFETCH_MIN_VIEWS = 2  # only drugs opened at least this often (after decay) are prefetched
+PREFETCH_WORKERS = 1
+PREFETCH_REQUESTS_PER_MINUTE = 30  # budget of the prefetch client, separate from interactive fetches
+PREFETCH_INTERVAL = 600  # seconds between prefetch rounds
+VIEW_HISTORY = 1000  # distinct drugs whose view counts are kept
+
+
+def load_drug_detail(drug_name: str, client: FDAAPIClient, limit: int = DRUG_QUERY_LIMIT,
+                     checkpoint_dir: Optional[str] = None) -> Dict:
+    """
+    Fetch and transform every report mentioning one drug
+
+    Returns:
+        {'drug_risk_profile': profile of all drugs on those reports,
+         'fetch_status': the query's fetch status}
+
+    Raises:
+        RuntimeError: Nothing was fetched because the query failed, so the
+        failure is not cached as "no reports"
+    """
+    raw_df = client.query_events(drug=drug_name, limit=limit, checkpoint_dir=checkpoint_dir)
+    status = raw_df.attrs.get('fetch_status', {})
+    if raw_df.empty:
+        if status.get('error'):
+            raise RuntimeError(status['error'])
+        return {'drug_risk_profile': pd.DataFrame(), 'fetch_status': status}
+    return {
+        'drug_risk_profile': client.transform_to_analytics(raw_df)['drug_risk_profile'],
+        'fetch_status': status,
+    }
+
+
+def detail_size(detail: Dict) -> int:
+    """Deep in-memory bytes of the frames in one detail"""
+    return sum(int(v.memory_usage(index=True, deep=True).sum()) for v in detail.values() if isinstance(v, pd.DataFrame))
+
+
+class DrugDetailCache:
+    """
+    Least-recently-used per-drug details, bounded by total frame bytes
+
+    Keys are normalized drug names, so every spelling of a product shares
+    one entry. Concurrent requests for the same drug (from sessions or the
+    prefetcher) share one in-flight load: a session that opens a drug the
+    prefetcher is already fetching waits for that fetch instead of issuing
+    its own. Failed loads are not cached, a detail larger than the whole
+    budget is returned but not kept, and entries older than `ttl` count
+    as misses.
+
+    Every `get` counts as a view. `prefetch_popular` reloads the drugs
+    users keep opening on a small background pool, so the usual
+    drilldowns are already in memory when opened. Only drugs actually
+    viewed are prefetched, never speculative ones, and background loads go
+    through `prefetch_loader`, which can use a client with its own, smaller
+    request budget so a user's fetch never queues behind them. Each
+    prefetch round halves the view counts, so popularity follows recent
+    traffic, and only the `view_history` most-viewed drugs are tracked.
+    """
+
+    def __init__(self, loader: Callable[[str], Dict], max_bytes: int = DETAIL_CACHE_BYTES,
+                 ttl: float = DETAIL_TTL, workers: int = PREFETCH_WORKERS,
+                 view_history: int = VIEW_HISTORY, prefetch_loader: Optional[Callable[[str], Dict]] = None):
+        self._loader = loader
+        self._prefetch_loader = prefetch_loader or loader
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()  # name -> (detail, bytes, loaded at)
+        self._bytes = 0
+        self._pending: Dict[str, Future] = {}
+        self._views = Counter()
+        self.view_history = view_history
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='drug-prefetch')
+        self._last_prefetch = None
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, drug_name: str, timeout: Optional[float] = None) -> Dict:
+        """One drug's detail, loading it in the calling thread on a miss"""
+        key = normalize_drug_name(drug_name)
+        with self._lock:
+            self._views[key] += 1
+            if len(self._views) > 2 * self.view_history:
+                self._trim_views()
+            if self._fresh(key):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if owner:
+            self._load(key, future, self._loader)
+        return future.result(timeout)
+
+    def peek(self, drug_name: str) -> Optional[Dict]:
+        """The cached detail, if any, without loading or counting a view"""
+        key = normalize_drug_name(drug_name)
+        with self._lock:
+            return self._entries[key][0] if self._fresh(key) else None
+
+    def _fresh(self, key: str) -> bool:
+        """Whether `key` is cached and within its TTL (call with the lock held)"""
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() - entry[2] < self.ttl
+
+    def _trim_views(self, decay: int = 0):
+        """Keep the `view_history` most-viewed drugs, counts shifted right by `decay` (call with the lock held)"""
+        self._views = Counter({
+            key: count >> decay for key, count in self._views.most_common(self.view_history) if count >> decay
+        })
+
+    def _load(self, key: str, future: Future, loader: Callable[[str], Dict]):
+        try:
+            detail = loader(key)
+        except Exception as e:
+            logger.warning(f"Drug detail load failed for {key}: {e}")
+            future.set_exception(e)
+        else:
+            self._store(key, detail)
+            future.set_result(detail)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _store(self, key: str, detail: Dict):
+        size = detail_size(detail)
+        if size > self.max_bytes:
+            logger.info(f"Drug detail for {key} ({size:,} bytes) exceeds the cache budget; not cached")
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old[1]
+            self._entries[key] = (detail, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def prefetch(self, drug_names: Sequence[str]) -> List[str]:
+        """
+        Load drugs in the background, skipping any cached or in flight
+
+        Returns:
+            The normalized names scheduled
+        """
+        scheduled = []
+        with self._lock:
+            for key in dict.fromkeys(normalize_drug_name(name) for name in drug_names):
+                if self._fresh(key) or key in self._pending:
+                    continue
+                future = self._pending[key] = Future()
+                scheduled.append((key, future))
+        for key, future in scheduled:
+            self._executor.submit(self._load, key, future, self._prefetch_loader)
+        if scheduled:
+            logger.info(f"Prefetching {len(scheduled)} drug details")
+        return [key for key, _ in scheduled]
+
+    def popular(self, n: int = PREFETCH_TOP_N, min_views: int = PREFETCH_MIN_VIEWS) -> List[str]:
+        """Up to `n` most-viewed drugs with at least `min_views` views"""
+        with self._lock:
+            return [key for key, count in self._views.most_common(n) if count >= min_views]
+
+    def prefetch_popular(self, n: int = PREFETCH_TOP_N, interval: float = PREFETCH_INTERVAL) -> List[str]:
+        """
+        `prefetch(popular(...))`, at most once per `interval` seconds
+
+        The interval stops a budget too small for the top `n` from
+        refetching the same evicted drugs on every rerun.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._last_prefetch is not None and now - self._last_prefetch < interval:
+                return []
+            self._last_prefetch = now
+        names = self.popular(n)
+        with self._lock:
+            self._trim_views(decay=1)
+        return self.prefetch(names)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'in_flight': len(self._pending),
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -4,14 +4,107 @@ Lightweight extraction without Airflow orchestration
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, Iterator, List, Tuple
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
 import time
+import random
 import logging
 
+from .checkpoint import FetchCheckpoint
+from .transform import build_silver, finish_drug_profile, merge_profile_partials, profile_partials, transform
+
 logger = logging.getLogger(__name__)
 
+SEX_CODES = {'male': '1', 'm': '1', '1': '1', 'female': '2', 'f': '2', '2': '2'}
+
+# Flattened event columns: report fields, then patient fields, then one row per drug
+REPORT_FIELDS = [
+    'safetyreportid', 'receivedate', 'receiptdate', 'serious',
+    'seriousnessdeath', 'seriousnesslifethreatening', 'seriousnesshospitalization',
+]
+PATIENT_FIELDS = {
+    'patient_age': 'patientonsetage',
+    'patient_age_unit': 'patientonsetageunit',
+    'patient_sex': 'patientsex',
+    'patient_weight': 'patientweight',
+}
+DRUG_FIELDS = {
+    'drug_name': 'medicinalproduct',
+    'drug_indication': 'drugindication',
+    'drug_characterization': 'drugcharacterization',
+}
+FLAT_COLUMNS = [*REPORT_FIELDS, *PATIENT_FIELDS, 'drug_sequence', *DRUG_FIELDS, 'reactions']
+
+
+def _normalize_date(value) -> str:
+    """Accept date/datetime/'YYYY-MM-DD'/'YYYYMMDD' and return openFDA's YYYYMMDD"""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y%m%d')
+    text = str(value).strip().replace('-', '')
+    datetime.strptime(text, '%Y%m%d')  # raises ValueError on malformed input
+    return text
+
+
+def combine_fetch_status(statuses: List[Dict]) -> Dict:
+    """Roll per-window fetch statuses up into one status for the whole load"""
+    fetched = sum(s.get('fetched', 0) for s in statuses)
+    expected = sum(s.get('expected', 0) for s in statuses)
+    available = sum(s.get('available') or 0 for s in statuses)
+    errors = [s['error'] for s in statuses if s.get('error')]
+    return {
+        'windows': len(statuses),
+        'fetched': fetched,
+        'expected': expected,
+        'available': available,
+        'complete': all(s.get('complete', False) for s in statuses),
+        'completeness': fetched / expected if expected else 1.0,
+        'error': '; '.join(errors) or None,
+    }
+
+
+def normalize_drug_name(name: str) -> str:
+    """Canonical spelling of a product name for queries and cache keys"""
+    return ' '.join(str(name).upper().replace('"', '').split())
+
+
+def build_search_query(drug: Optional[str] = None, date_from=None, date_to=None,
+                       serious: Optional[bool] = None, sex: Optional[str] = None) -> str:
+    """
+    Compile structured filters into a normalized openFDA `search=` expression
+    
+    Inputs are canonicalized (upper-cased drug, YYYYMMDD dates, FAERS codes)
+    and clauses are emitted in a fixed order, so equivalent filters always
+    produce the same string and therefore share a cache entry.
+    
+    Returns:
+        The search expression, or '' when no filter is set
+    """
+    clauses = []
+    
+    if drug:
+        clauses.append(f'patient.drug.medicinalproduct:"{normalize_drug_name(drug)}"')
+    
+    if date_from or date_to:
+        start = _normalize_date(date_from) if date_from else '19000101'
+        end = _normalize_date(date_to) if date_to else datetime.now().strftime('%Y%m%d')
+        clauses.append(f'receivedate:[{start} TO {end}]')
+    
+    if serious is not None:
+        clauses.append(f'serious:{1 if serious else 2}')
+    
+    if sex is not None:
+        code = SEX_CODES.get(str(sex).strip().lower())
+        if code is None:
+            raise ValueError(f"Unknown sex filter: {sex!r}")
+        clauses.append(f'patient.patientsex:{code}')
+    
+    # requests encodes spaces as '+', which is what openFDA expects between terms
+    return ' AND '.join(clauses)
+
 
 class FDAAPIClient:
     """Simplified FDA API client for Streamlit app"""
@@ -19,236 +112,515 @@ class FDAAPIClient:
     BASE_URL = 'https://api.fda.gov/drug/event.json'
     RATE_LIMIT_REQUESTS = 240  # per minute
     RATE_LIMIT_PERIOD = 60  # seconds
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 1.0  # seconds
+    BACKOFF_CAP = 30.0  # seconds
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    POOL_CONNECTIONS = 4
+    POOL_MAXSIZE = 16  # connections kept alive per host for concurrent fetches
+    SKIP_CEILING = 25000  # openFDA rejects skip beyond this
+    COUNT_LIMIT = 1000  # max buckets returned by a count= query
     
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, requests_per_minute: Optional[int] = None):
+        """
+        Args:
+            requests_per_minute: Request budget of this client, below
+                `RATE_LIMIT_REQUESTS` for background work that must not
+                crowd out interactive fetches
+        """
+        if requests_per_minute is not None:
+            self.RATE_LIMIT_REQUESTS = requests_per_minute
+        self.session = self._build_session()
         self.request_times = []
+        self._rate_lock = threading.Lock()
+        self.last_fetch_status = None
+    
+    def _build_session(self) -> requests.Session:
+        """Session with a sized keep-alive pool and compressed transfer"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_CONNECTIONS,
+            pool_maxsize=self.POOL_MAXSIZE,
+            pool_block=True,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        return session
     
     def _rate_limit(self):
-        """Implement rate limiting"""
-        now = time.time()
-        self.request_times = [t for t in self.request_times if now - t < self.RATE_LIMIT_PERIOD]
+        """
+        Implement rate limiting
         
-        if len(self.request_times) >= self.RATE_LIMIT_REQUESTS:
-            sleep_time = self.RATE_LIMIT_PERIOD - (now - self.request_times[0])
-            if sleep_time > 0:
-                logger.info(f"Rate limit reached, sleeping for {sleep_time:.2f}s")
-                time.sleep(sleep_time)
+        Thread-safe: concurrent fetches on one client share a single
+        request budget, queueing on the lock while the window is full.
+        """
+        with self._rate_lock:
+            now = time.time()
+            self.request_times = [t for t in self.request_times if now - t < self.RATE_LIMIT_PERIOD]
+            
+            if len(self.request_times) >= self.RATE_LIMIT_REQUESTS:
+                sleep_time = self.RATE_LIMIT_PERIOD - (now - self.request_times[0])
+                if sleep_time > 0:
+                    logger.info(f"Rate limit reached, sleeping for {sleep_time:.2f}s")
+                    time.sleep(sleep_time)
+                    now = time.time()
+            
+            self.request_times.append(now)
+    
+    def _is_transient(self, error: requests.exceptions.RequestException) -> bool:
+        """Decide whether a failed request is worth retrying"""
+        if isinstance(error, requests.exceptions.HTTPError):
+            status = error.response.status_code if error.response is not None else None
+            return status in self.RETRY_STATUS_CODES
+        return isinstance(error, (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+            requests.exceptions.JSONDecodeError,
+        ))
+    
+    def _backoff_delay(self, attempt: int, error: requests.exceptions.RequestException) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when sent"""
+        response = getattr(error, 'response', None)
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.BACKOFF_CAP)
         
-        self.request_times.append(now)
+        return random.uniform(0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * (2 ** attempt)))
     
-    def fetch_adverse_events(self, limit: int = 5000) -> pd.DataFrame:
+    def _request(self, params: Dict, headers: Optional[Dict] = None) -> requests.Response:
+        """
+        GET one page, retrying transient failures
+        
+        Returns:
+            The response; 304 and 404 are returned rather than raised
+        
+        Raises:
+            requests.exceptions.RequestException once retries are exhausted
+            or on a non-transient error
+        """
+        attempt = 0
+        while True:
+            self._rate_limit()
+            try:
+                response = self.session.get(self.BASE_URL, params=params, headers=headers, timeout=30)
+                if response.status_code in (304, 404):
+                    return response
+                response.raise_for_status()
+                return response
+                
+            except requests.exceptions.RequestException as e:
+                if attempt >= self.MAX_RETRIES or not self._is_transient(e):
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                attempt += 1
+                logger.warning(
+                    f"Transient API error ({e}), retry {attempt}/{self.MAX_RETRIES} in {delay:.1f}s"
+                )
+                time.sleep(delay)
+    
+    def _get(self, params: Dict) -> Dict:
+        """
+        GET one page as parsed JSON ({} when openFDA reports no matches)
+        """
+        response = self._request(params)
+        if response.status_code == 404:
+            # openFDA answers 404 when a query (or skip offset) has no matches
+            return {}
+        return response.json()
+    
+    def probe(self, base_params: Dict, checkpoint: Optional[FetchCheckpoint] = None) -> Dict:
+        """
+        Cheap single-record request to see whether the dataset changed
+        
+        Sends If-None-Match / If-Modified-Since when the checkpoint holds
+        validators, and otherwise compares `meta.last_updated`.
+        
+        Returns:
+            Dict with `changed`, `last_updated`, `total`, `etag`, `last_modified`
+        """
+        headers = {}
+        if checkpoint and checkpoint.etag:
+            headers['If-None-Match'] = checkpoint.etag
+        if checkpoint and checkpoint.last_modified:
+            headers['If-Modified-Since'] = checkpoint.last_modified
+        
+        params = dict(base_params)
+        params['limit'] = 1
+        response = self._request(params, headers=headers or None)
+        
+        if response.status_code == 304:
+            return {
+                'changed': False,
+                'last_updated': checkpoint.last_updated,
+                'total': checkpoint.total_available,
+                'etag': checkpoint.etag,
+                'last_modified': checkpoint.last_modified,
+            }
+        
+        data = response.json() if response.status_code != 404 else {}
+        meta = data.get('meta', {})
+        last_updated = meta.get('last_updated')
+        changed = (
+            checkpoint is None
+            or checkpoint.last_updated is None
+            or last_updated is None
+            or last_updated != checkpoint.last_updated
+        )
+        return {
+            'changed': changed,
+            'last_updated': last_updated,
+            'total': meta.get('results', {}).get('total'),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+    
+    def fetch_adverse_events(self, limit: int = 5000, checkpoint_dir: Optional[str] = None,
+                             on_page: Optional[Callable[[int, List[Dict]], None]] = None) -> pd.DataFrame:
         """
         Fetch adverse events from FDA API
         
         Args:
             limit: Number of records to fetch (default 5000 for good sample)
+            checkpoint_dir: Directory for page checkpoints. When set, completed
+                pages are persisted and a later call resumes from the last
+                good page instead of starting again at skip=0. A finished
+                checkpoint is kept as a local copy: later calls revalidate it
+                with one probe request and skip the download if openFDA has
+                not published an update since.
+            on_page: Called as `on_page(skip, records)` with each page of raw
+                records as it is loaded (pages reused from a checkpoint
+                first), e.g. to feed streaming sketches. A call with
+                `skip=0` after earlier pages means the load restarted and
+                those pages were discarded.
         
         Returns:
-            DataFrame with flattened adverse events
+            DataFrame with flattened adverse events. Completeness of the load
+            is reported in `df.attrs['fetch_status']` (also kept on
+            `self.last_fetch_status`).
         """
-        all_records = []
-        skip = 0
+        return self._fetch_pages({}, limit, checkpoint_dir, on_page)
+    
+    def query_events(self, drug: Optional[str] = None, date_from=None, date_to=None,
+                     serious: Optional[bool] = None, sex: Optional[str] = None,
+                     limit: int = 5000, checkpoint_dir: Optional[str] = None) -> pd.DataFrame:
+        """
+        Fetch only the adverse events matching structured filters
+        
+        Filters are compiled into an openFDA `search=` expression so the API
+        returns the matching records instead of a generic sample. Results
+        are checkpointed per normalized query, so repeating a query (in any
+        spelling) revalidates with one probe instead of refetching.
+        
+        Args:
+            drug: Medicinal product name (matched as a phrase)
+            date_from: Earliest `receivedate` (date, datetime or YYYY-MM-DD/YYYYMMDD)
+            date_to: Latest `receivedate`
+            serious: True for serious reports only, False for non-serious only
+            sex: 'male'/'female' or the FAERS codes '1'/'2'
+            limit: Maximum records to fetch
+            checkpoint_dir: Directory for per-query page checkpoints
+        
+        Returns:
+            DataFrame with flattened adverse events, `fetch_status` in attrs
+        """
+        search = build_search_query(drug=drug, date_from=date_from, date_to=date_to, serious=serious, sex=sex)
+        base_params = {'search': search} if search else {}
+        return self._fetch_pages(base_params, limit, checkpoint_dir)
+    
+    def _fetch_pages(self, base_params: Dict, limit: int, checkpoint_dir: Optional[str],
+                     on_page: Optional[Callable[[int, List[Dict]], None]] = None) -> pd.DataFrame:
+        """
+        Paginate one query with checkpointing, revalidation and retries
+        """
+        checkpoint = FetchCheckpoint(checkpoint_dir, base_params) if checkpoint_dir else None
+        revalidated = False
+        
+        if checkpoint and checkpoint.pages:
+            try:
+                probe = self.probe(base_params, checkpoint)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Revalidation probe failed ({e}), continuing from checkpoint")
+            else:
+                if probe['changed']:
+                    logger.info(
+                        f"Dataset changed ({checkpoint.last_updated} -> {probe['last_updated']}), refetching"
+                    )
+                    checkpoint.reset()
+                else:
+                    revalidated = True
+                    logger.info(f"Dataset unchanged since {checkpoint.last_updated}, reusing local pages")
+                checkpoint.etag = probe['etag']
+                checkpoint.last_modified = probe['last_modified']
+                if checkpoint.pages:
+                    checkpoint.save_manifest()
+        
+        all_records = checkpoint.load_records()[:limit] if checkpoint else []
+        total_available = checkpoint.total_available if checkpoint else None
+        resumed_from = len(all_records)
+        skip = len(all_records)
         batch_size = 100  # FDA API max per request
+        error = None
+        pages_fetched = 0
+        if on_page:
+            for offset in range(0, len(all_records), batch_size):
+                on_page(offset, all_records[offset:offset + batch_size])
         
-        while len(all_records) < limit:
-            self._rate_limit()
+        while len(all_records) < limit and (total_available is None or skip < total_available):
+            if skip >= self.SKIP_CEILING:
+                error = f"openFDA skip ceiling ({self.SKIP_CEILING}) reached; use plan_date_windows to go further"
+                logger.error(error)
+                break
             
-            params = {
-                'limit': min(batch_size, limit - len(all_records)),
-                'skip': skip
-            }
+            params = dict(base_params)
+            params['limit'] = min(batch_size, limit - len(all_records))
+            params['skip'] = skip
             
             try:
-                response = self.session.get(self.BASE_URL, params=params, timeout=30)
-                response.raise_for_status()
-                
-                data = response.json()
-                results = data.get('results', [])
-                
-                if not results:
-                    break
-                
-                all_records.extend(results)
-                logger.info(f"Fetched {len(results)} records (total: {len(all_records)})")
-                
-                skip += len(results)
-                
-                # Check if we've reached the end
-                meta = data.get('meta', {})
-                total_results = meta.get('results', {}).get('total', 0)
-                if skip >= total_results:
-                    break
-                    
+                data = self._get(params)
             except requests.exceptions.RequestException as e:
-                logger.error(f"API request failed: {e}")
+                logger.error(f"API request failed after retries: {e}")
+                error = str(e)
                 break
+            
+            results = data.get('results', [])
+            if not results:
+                break
+            
+            meta = data.get('meta', {})
+            last_updated = meta.get('last_updated')
+            if checkpoint and checkpoint.last_updated and last_updated and last_updated != checkpoint.last_updated:
+                # Source data was republished mid-load; earlier offsets are no longer valid
+                logger.warning(
+                    f"Dataset updated ({checkpoint.last_updated} -> {last_updated}), discarding checkpoint"
+                )
+                checkpoint.reset()
+                all_records, skip, resumed_from = [], 0, 0
+                continue
+            
+            total_available = meta.get('results', {}).get('total', total_available)
+            if checkpoint:
+                checkpoint.add_page(skip, results, total_available, last_updated)
+            
+            if on_page:
+                on_page(skip, results)
+            all_records.extend(results)
+            pages_fetched += 1
+            logger.info(f"Fetched {len(results)} records (total: {len(all_records)})")
+            
+            skip += len(results)
+            
+            # Check if we've reached the end
+            if total_available is not None and skip >= total_available:
+                break
+        
+        expected = min(limit, total_available) if total_available is not None else limit
+        status = {
+            'query': base_params.get('search'),
+            'requested': limit,
+            'fetched': len(all_records),
+            'expected': expected,
+            'available': total_available,
+            'resumed_from': resumed_from,
+            'pages_fetched': pages_fetched,
+            'revalidated': revalidated,
+            'complete': error is None and len(all_records) >= expected,
+            'completeness': len(all_records) / expected if expected else 1.0,
+            'error': error,
+        }
+        self.last_fetch_status = status
+        
+        if not status['complete']:
+            logger.warning(
+                f"Partial extraction: {status['fetched']}/{status['expected']} records "
+                f"({status['completeness']:.0%})"
+                + (", checkpoint kept for resume" if checkpoint else "")
+            )
         
         # Flatten the nested structure
         df = self._flatten_events(all_records)
+        df.attrs['fetch_status'] = status
         logger.info(f"Extraction complete: {len(df)} total records")
         
         return df
     
+    def plan_date_windows(self, date_from, date_to, **filters) -> List[Tuple[str, str, int]]:
+        """
+        Split a receivedate range into windows that stay under the skip ceiling
+        
+        Daily report counts come from openFDA's `count=receivedate`
+        aggregation (one request per 1,000 days); consecutive days are then
+        packed greedily into windows of at most `SKIP_CEILING` reports. A
+        single day above the ceiling becomes its own window and can only be
+        fetched partially.
+        
+        Args:
+            date_from: First receivedate (inclusive)
+            date_to: Last receivedate (inclusive)
+            **filters: Extra `query_events` filters (drug, serious, sex)
+        
+        Returns:
+            List of (start, end, report_count) with YYYYMMDD dates
+        """
+        start = datetime.strptime(_normalize_date(date_from), '%Y%m%d')
+        end = datetime.strptime(_normalize_date(date_to), '%Y%m%d')
+        
+        daily = {}
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=self.COUNT_LIMIT - 1), end)
+            search = build_search_query(date_from=chunk_start, date_to=chunk_end, **filters)
+            data = self._get({'search': search, 'count': 'receivedate', 'limit': self.COUNT_LIMIT})
+            for bucket in data.get('results', []):
+                daily[bucket['time']] = daily.get(bucket['time'], 0) + bucket['count']
+            chunk_start = chunk_end + timedelta(days=1)
+        
+        windows = []
+        window_start, window_end, window_count = None, None, 0
+        for day in sorted(daily):
+            count = daily[day]
+            if count > self.SKIP_CEILING:
+                logger.warning(f"{day} has {count} reports, above the {self.SKIP_CEILING} skip ceiling")
+            if window_start is not None and window_count + count > self.SKIP_CEILING:
+                windows.append((window_start, window_end, window_count))
+                window_start, window_count = None, 0
+            if window_start is None:
+                window_start = day
+            window_end = day
+            window_count += count
+        if window_start is not None:
+            windows.append((window_start, window_end, window_count))
+        
+        logger.info(f"Planned {len(windows)} windows for {sum(daily.values())} reports")
+        return windows
+    
+    def iter_date_range(self, date_from, date_to, workers: int = 4,
+                        checkpoint_dir: Optional[str] = None, **filters) -> Iterator[pd.DataFrame]:
+        """
+        Stream a full receivedate range as flattened per-window DataFrames
+        
+        Windows are fetched in parallel threads that share this client's rate
+        budget. At most `workers` windows are in flight or waiting to be
+        consumed, so memory stays bounded by a few windows of raw JSON no
+        matter how long the range is. Frames are yielded as they complete
+        (not in date order), each with its own `fetch_status`.
+        
+        Args:
+            date_from: First receivedate (inclusive)
+            date_to: Last receivedate (inclusive)
+            workers: Windows fetched concurrently
+            checkpoint_dir: Directory for per-window page checkpoints
+            **filters: Extra `query_events` filters (drug, serious, sex)
+        """
+        windows = self.plan_date_windows(date_from, date_to, **filters)
+        
+        def fetch_window(window):
+            start, end, count = window
+            return self.query_events(
+                date_from=start, date_to=end, limit=count, checkpoint_dir=checkpoint_dir, **filters
+            )
+        
+        pending = iter(windows)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = set()
+            for window in pending:
+                in_flight.add(pool.submit(fetch_window, window))
+                if len(in_flight) >= workers:
+                    break
+            
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    next_window = next(pending, None)
+                    if next_window is not None:
+                        in_flight.add(pool.submit(fetch_window, next_window))
+                    yield future.result()
+    
     def _flatten_events(self, records: List[Dict]) -> pd.DataFrame:
         """
         Flatten nested JSON structure from FDA API
+        
+        One row per (report, drug). Values are appended straight into
+        per-column lists rather than a dict per row, which keeps the peak
+        of this stage close to the size of the finished frame.
         """
-        flattened_records = []
+        columns = {name: [] for name in FLAT_COLUMNS}
         
         for record in records:
-            base_record = {
-                'safetyreportid': record.get('safetyreportid'),
-                'receivedate': record.get('receivedate'),
-                'receiptdate': record.get('receiptdate'),
-                'serious': record.get('serious'),
-                'seriousnessdeath': record.get('seriousnessdeath'),
-                'seriousnesslifethreatening': record.get('seriousnesslifethreatening'),
-                'seriousnesshospitalization': record.get('seriousnesshospitalization'),
-            }
-            
-            # Extract patient info
             patient = record.get('patient', {})
-            base_record['patient_age'] = patient.get('patientonsetage')
-            base_record['patient_age_unit'] = patient.get('patientonsetageunit')
-            base_record['patient_sex'] = patient.get('patientsex')
-            base_record['patient_weight'] = patient.get('patientweight')
-            
             # Extract drugs (can have multiple drugs per event)
             drugs = patient.get('drug', [])
-            for drug_idx, drug in enumerate(drugs):
-                drug_record = base_record.copy()
-                drug_record['drug_sequence'] = drug_idx + 1
-                drug_record['drug_name'] = drug.get('medicinalproduct')
-                drug_record['drug_indication'] = drug.get('drugindication')
-                drug_record['drug_characterization'] = drug.get('drugcharacterization')
-                
-                # Extract reactions for this drug
-                reactions = patient.get('reaction', [])
-                if reactions:
-                    drug_record['reactions'] = '|'.join([
-                        r.get('reactionmeddrapt', '') for r in reactions
-                    ])
-                else:
-                    drug_record['reactions'] = None
-                
-                flattened_records.append(drug_record)
+            if not drugs:
+                continue
+            n_drugs = len(drugs)
+            
+            for field in REPORT_FIELDS:
+                columns[field].extend([record.get(field)] * n_drugs)
+            for column, field in PATIENT_FIELDS.items():
+                columns[column].extend([patient.get(field)] * n_drugs)
+            
+            columns['drug_sequence'].extend(range(1, n_drugs + 1))
+            for column, field in DRUG_FIELDS.items():
+                columns[column].extend([drug.get(field) for drug in drugs])
+            
+            # Reactions are per report; every drug row carries them
+            reactions = patient.get('reaction', [])
+            reaction_text = '|'.join([r.get('reactionmeddrapt', '') for r in reactions]) if reactions else None
+            columns['reactions'].extend([reaction_text] * n_drugs)
         
-        return pd.DataFrame(flattened_records)
+        if not columns['safetyreportid']:
+            return pd.DataFrame()
+        return pd.DataFrame(columns)
     
-    def transform_to_analytics(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    def transform_to_analytics(self, df: pd.DataFrame, workers: Optional[int] = 1) -> Dict[str, pd.DataFrame]:
         """
         Transform raw FDA data to analytics-ready format
         Mimics Silver + Gold layer transformations
         
+        Args:
+            df: Flattened events from `fetch_adverse_events`
+            workers: Set >1 (or None for all CPUs) to hash-partition large
+                extracts by drug across a process pool
+        
         Returns:
             Dictionary with transformed DataFrames
         """
-        # Silver layer: Clean and standardize
-        df_clean = df.copy()
-        
-        # Age normalization (fix the FDA code bug)
-        age_unit_map = {
-            '800': 'Decade',
-            '801': 'Year',
-            '802': 'Month', 
-            '803': 'Week',
-            '804': 'Day',
-            '805': 'Hour'
-        }
-        
-        df_clean['patient_age_unit_name'] = df_clean['patient_age_unit'].astype(str).map(age_unit_map)
-        
-        # Convert all ages to years
-        def normalize_age(row):
-            if pd.isna(row['patient_age']) or pd.isna(row['patient_age_unit_name']):
-                return None
-            
-            age = float(row['patient_age'])
-            unit = row['patient_age_unit_name']
-            
-            if unit == 'Decade':
-                return age * 10.0
-            elif unit == 'Year':
-                return age
-            elif unit == 'Month':
-                return age / 12.0
-            elif unit == 'Week':
-                return age / 52.0
-            elif unit == 'Day':
-                return age / 365.0
-            elif unit == 'Hour':
-                return age / 8760.0
-            return None
-        
-        df_clean['patient_age_years'] = df_clean.apply(normalize_age, axis=1)
-        
-        # Sex standardization
-        sex_map = {'1': 'Male', '2': 'Female'}
-        df_clean['patient_sex_name'] = df_clean['patient_sex'].astype(str).map(sex_map).fillna('Unknown')
-        
-        # Boolean flags
-        df_clean['is_serious'] = df_clean['serious'].fillna(0).astype(int)
-        df_clean['is_death'] = df_clean['seriousnessdeath'].fillna(0).astype(int)
-        df_clean['is_life_threatening'] = df_clean['seriousnesslifethreatening'].fillna(0).astype(int)
-        df_clean['is_hospitalization'] = df_clean['seriousnesshospitalization'].fillna(0).astype(int)
- 
-       # Gold layer: Build drug risk profile mart
-        # Step 1: Deduplicate - keep one row per (drug, report) combination
-        df_deduped = df_clean.drop_duplicates(subset=['drug_name', 'safetyreportid'], keep='first')
-
-        # Step 2: Aggregate directly to drug level
-        drug_profile = df_deduped.groupby('drug_name').agg({  # ← THIS LINE
-            'safetyreportid': 'count',
-            'is_serious': 'sum',
-            'is_death': 'sum',
-            'is_life_threatening': 'sum',
-            'is_hospitalization': 'sum',
-            'patient_age_years': 'mean',
-            'drug_indication': lambda x: '|'.join([str(i) for i in x.dropna().unique()[:5]])
-        }).reset_index()
-        
-        drug_profile.columns = [
-            'drug_name',
-            'total_adverse_events',
-            'serious_events',
-            'death_reports',
-            'life_threatening_events',
-            'hospitalization_events',
-            'avg_patient_age',
-            'common_indications'
-        ]
-        
-        # Calculate rates
-        drug_profile['serious_event_rate'] = (
-            drug_profile['serious_events'] / drug_profile['total_adverse_events'] * 100
-        ).fillna(0)
-        
-        drug_profile['fatality_rate'] = (
-            drug_profile['death_reports'] / drug_profile['total_adverse_events'] * 100
-        ).fillna(0)
-        
-        # Risk classification
-        def classify_risk(row):
-            if row['total_adverse_events'] < 5:
-                return 'Minimal Data'
-            elif row['fatality_rate'] > 15:
-                return 'High Risk'
-            elif row['fatality_rate'] > 5:
-                return 'Moderate Risk'
-            else:
-                return 'Low Risk'
-        
-        drug_profile['risk_classification'] = drug_profile.apply(classify_risk, axis=1)
+        return transform(df, workers=workers)
+    
+    def transform_stream(self, frames, keep_events: bool = True) -> Dict[str, pd.DataFrame]:
+        """
+        Transform an iterable of flattened frames (e.g. `iter_date_range`)
         
-        # Severity score (0-5)
-        drug_profile['avg_severity_score'] = (
-            (drug_profile['serious_event_rate'] / 20) +
-            (drug_profile['fatality_rate'] / 20) +
-            (drug_profile['life_threatening_events'] / drug_profile['total_adverse_events'] * 5)
-        ).clip(0, 5)
+        Silver is built per frame as it arrives, and the frame's additive
+        gold partials (per-drug sums and (drug, value) counts) are merged
+        into a running total, so gold never needs the combined events.
+        With `keep_events=False` each frame is dropped once aggregated and
+        memory is bounded by the frames in flight plus the per-drug
+        partials; with the default, the returned events are all silver
+        rows and grow with the extract. Frames must hold disjoint reports,
+        as date windows do; a report repeated across frames is counted in
+        each. Per-frame fetch statuses are combined into the events
+        frame's `fetch_status`.
+        """
+        silver, statuses, partials = [], [], None
+        for frame in frames:
+            statuses.append(frame.attrs.get('fetch_status', {}))
+            if frame.empty:
+                continue
+            frame_silver = build_silver(frame)
+            frame_partials = profile_partials(frame_silver)
+            partials = frame_partials if partials is None else merge_profile_partials([partials, frame_partials])
+            if keep_events:
+                silver.append(frame_silver)
         
+        events = pd.concat(silver, ignore_index=True) if silver else pd.DataFrame()
+        events.attrs['fetch_status'] = combine_fetch_status(statuses)
         return {
-            'events': df_clean,
-            'drug_risk_profile': drug_profile
-        }
\ No newline at end of file
+            'events': events,
+            'drug_risk_profile': finish_drug_profile(partials) if partials is not None else pd.DataFrame()
+        }
@@ -0,0 +1,65 @@
+"""
+Figure Payloads
+Shrinks chart data before it is handed to Plotly and measures what
+each figure costs to build and ship to the browser
+"""
+
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Decimal places kept for float columns sent to the browser
+PRECISION = 3
+# Rows above this are downsampled before plotting
+MAX_POINTS = 2000
+
+
+def reduce_payload(df: pd.DataFrame, max_points: int = MAX_POINTS, precision: int = PRECISION,
+                   priority: Optional[str] = None) -> pd.DataFrame:
+    """
+    Round float columns and cap the number of rows
+
+    Args:
+        df: Chart data
+        max_points: Row cap; larger frames are downsampled
+        precision: Decimal places kept for float columns
+        priority: Column to keep the largest rows by when downsampling;
+            without it rows are sampled evenly across the frame
+    """
+    out = df
+    if len(out) > max_points:
+        if priority:
+            out = out.nlargest(max_points, priority)
+        else:
+            out = out.iloc[np.linspace(0, len(out) - 1, max_points).astype(int)]
+
+    float_cols = out.select_dtypes('float').columns
+    if len(float_cols):
+        out = out.assign(**{c: out[c].round(precision) for c in float_cols})
+    return out
+
+
+def build_measured(build: Callable) -> Tuple[str, Dict]:
+    """
+    Build a figure, serialize it and record its cost
+
+    Returns:
+        (spec, stats) where spec is the figure's JSON and stats holds
+        `build_ms`, `points` (data points across all traces) and `bytes`
+        (spec size)
+    """
+    start = time.perf_counter()
+    fig = build()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    points = sum(len(trace.x) for trace in fig.data if getattr(trace, 'x', None) is not None)
+    points += sum(len(trace.values) for trace in fig.data if getattr(trace, 'values', None) is not None)
+    spec = fig.to_json()
+    stats = {
+        'build_ms': build_ms,
+        'points': points,
+        'bytes': len(spec),
+    }
+    return spec, stats
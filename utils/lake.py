@@ -0,0 +1,225 @@
+"""
+Event Lake
+Silver events and per-month gold drug profiles as a month-partitioned
+Parquet dataset, so date-range and single-drug reads touch only the
+partitions, row groups and columns they need
+"""
+
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .fda_api import _normalize_date
+from .snapshot import _to_arrow
+from .transform import GOLD_INPUT_COLUMNS, build_drug_profile
+
+logger = logging.getLogger(__name__)
+
+EVENTS = 'events'
+DRUG_PROFILE = 'drug_profile'
+PARTITION_KEY = 'month'  # YYYYMM of receivedate
+# Rows are sorted by drug_name, so small row groups let drug filters skip most of a file
+ROW_GROUP_SIZE = 16_384
+
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_KEY, pa.string())]), flavor='hive')
+
+
+class EventLake:
+    """
+    Month-partitioned Parquet store under `root`
+
+    Layout:
+        events/month=YYYYMM/part.parquet         silver rows received that month
+        drug_profile/month=YYYYMM/part.parquet   gold profile of that month alone
+
+    `append` only touches the months present in the new events: an unseen
+    month is a new partition, and a month already stored (typically the
+    current, still-filling one) is merged with its new rows, a refetched
+    report replacing its stored rows, and swapped in; every other
+    partition is left as written. Reads build a `pyarrow.dataset` filter,
+    so whole partitions are pruned by month, row groups by the drug_name
+    min/max statistics, and only the projected columns are decoded.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def months(self, table: str = EVENTS) -> List[str]:
+        """Stored partitions, oldest first"""
+        prefix = f'{PARTITION_KEY}='
+        base = self.root / table
+        if not base.exists():
+            return []
+        return sorted(p.name[len(prefix):] for p in base.iterdir() if p.is_dir() and p.name.startswith(prefix))
+
+    def append(self, events: pd.DataFrame) -> List[str]:
+        """
+        Add silver events, rewriting only the months they fall in
+
+        Returns:
+            The months written
+        """
+        months = events['receivedate'].astype(str).str[:6]
+        valid = months.str.fullmatch(r'\d{6}')
+        if not valid.all():
+            logger.warning(f"Skipping {int((~valid).sum())} events without a usable receivedate")
+
+        written = []
+        for month, batch in events[valid].groupby(months[valid], sort=True):
+            stored = self._read_partition(EVENTS, month)
+            if stored is not None:
+                # A report fetched again replaces all of its stored rows
+                stored = stored[~stored['safetyreportid'].isin(batch['safetyreportid'])]
+                batch = pd.concat([stored, batch[stored.columns.intersection(batch.columns)]], ignore_index=True)
+            batch = batch.sort_values(['drug_name', 'safetyreportid'], kind='stable', na_position='last').reset_index(drop=True)
+            self._write_partition(EVENTS, month, batch)
+            self._write_partition(DRUG_PROFILE, month, build_drug_profile(batch[GOLD_INPUT_COLUMNS]))
+            written.append(month)
+        logger.info(f"Event lake: wrote {len(written)} month partitions ({', '.join(written)})")
+        return written
+
+    def _partition_dir(self, table: str, month: str) -> Path:
+        return self.root / table / f'{PARTITION_KEY}={month}'
+
+    def _read_partition(self, table: str, month: str) -> Optional[pd.DataFrame]:
+        path = self._partition_dir(table, month)
+        if not path.exists():
+            return None
+        return ds.dataset(path, format='parquet').to_table().to_pandas()
+
+    def _write_partition(self, table: str, month: str, df: pd.DataFrame):
+        """
+        Write one partition and swap it in
+
+        The new files are written under a dot-prefixed directory, which
+        dataset discovery ignores, then renamed into place; a reader
+        listing files mid-swap can miss that month but never sees a
+        half-written file.
+        """
+        final = self._partition_dir(table, month)
+        staging = final.parent / f'.{final.name}.{time.time_ns()}'
+        staging.mkdir(parents=True)
+        pq.write_table(_lake_table(df), staging / 'part.parquet', row_group_size=ROW_GROUP_SIZE)
+
+        retired = None
+        if final.exists():
+            retired = final.parent / f'.{final.name}.old.{time.time_ns()}'
+            os.replace(final, retired)
+        os.replace(staging, final)
+        if retired is not None:
+            shutil.rmtree(retired, ignore_errors=True)
+
+    def _dataset(self, table: str) -> Optional[ds.Dataset]:
+        base = self.root / table
+        if not self.months(table):
+            return None
+        return ds.dataset(base, format='parquet', partitioning=PARTITIONING)
+
+    def _filter(self, drugs: Optional[Sequence[str]], date_from, date_to, day_column: Optional[str]):
+        conditions = []
+        if date_from is not None:
+            start = _normalize_date(date_from)
+            conditions.append(ds.field(PARTITION_KEY) >= start[:6])
+            if day_column:
+                conditions.append(ds.field(day_column) >= start)
+        if date_to is not None:
+            end = _normalize_date(date_to)
+            conditions.append(ds.field(PARTITION_KEY) <= end[:6])
+            if day_column:
+                conditions.append(ds.field(day_column) <= end)
+        if drugs:
+            conditions.append(ds.field('drug_name').isin(list(drugs)))
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def scan(self, table: str = EVENTS, columns: Optional[Sequence[str]] = None,
+             drugs: Optional[Sequence[str]] = None, date_from=None, date_to=None) -> pd.DataFrame:
+        """
+        Read matching rows of one table
+
+        Args:
+            table: `EVENTS` or `DRUG_PROFILE`
+            columns: Columns to decode (default all, plus `month`)
+            drugs: Keep only these drug names
+            date_from: First receivedate (inclusive); prunes earlier months
+            date_to: Last receivedate (inclusive); prunes later months
+
+        Returns:
+            Matching rows; `df.attrs['lake_scan']` records how many
+            partition files (and row groups within them) were read out of
+            how many are stored
+        """
+        dataset = self._dataset(table)
+        if dataset is None:
+            return pd.DataFrame(columns=list(columns or []))
+
+        # Day-level bounds apply to events; profiles are monthly, so only months are pruned
+        expression = self._filter(drugs, date_from, date_to, 'receivedate' if table == EVENTS else None)
+        fragments = list(dataset.get_fragments(filter=expression))
+        row_groups = sum(len(fragment.split_by_row_group(expression, schema=dataset.schema)) for fragment in fragments)
+        scanned = dataset.to_table(columns=list(columns) if columns else None, filter=expression)
+
+        df = scanned.to_pandas()
+        df.attrs['lake_scan'] = {
+            'table': table,
+            'files_read': len(fragments),
+            'files_total': len(dataset.files),
+            'row_groups_read': row_groups,
+            'columns': list(scanned.column_names),
+            'rows': len(df),
+        }
+        return df
+
+    def drug_profile(self, drugs: Optional[Sequence[str]] = None, date_from=None, date_to=None) -> pd.DataFrame:
+        """
+        Exact gold profile over a date range, rebuilt from the matching
+        silver rows (only the columns gold reads are decoded)
+        """
+        events = self.scan(EVENTS, columns=GOLD_INPUT_COLUMNS, drugs=drugs, date_from=date_from, date_to=date_to)
+        if events.empty:
+            return pd.DataFrame()
+        profile = build_drug_profile(events)
+        profile.attrs['lake_scan'] = events.attrs['lake_scan']
+        return profile
+
+    def monthly_profile(self, drugs: Sequence[str], columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Per-month gold rows for the given drugs, oldest first"""
+        columns = list(columns) if columns else None
+        if columns and PARTITION_KEY not in columns:
+            columns = [PARTITION_KEY, 'drug_name', *[c for c in columns if c != 'drug_name']]
+        df = self.scan(DRUG_PROFILE, columns=columns, drugs=drugs)
+        if df.empty:
+            return df
+        return df.sort_values([PARTITION_KEY, 'drug_name']).reset_index(drop=True)
+
+    def summary(self) -> Dict:
+        return {
+            table: {'months': len(self.months(table)), 'bytes': _tree_size(self.root / table)}
+            for table in (EVENTS, DRUG_PROFILE)
+        }
+
+
+def _lake_table(df: pd.DataFrame) -> pa.Table:
+    """Arrow table with all-null columns typed as strings, so every partition shares one schema"""
+    table = _to_arrow(df).replace_schema_metadata(None)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    return table
+
+
+def _tree_size(path: Path) -> int:
+    if not path.exists():
+        return 0
+    return sum(f.stat().st_size for f in path.rglob('*.parquet'))
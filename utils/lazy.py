@@ -0,0 +1,31 @@
+"""
+Deferred Imports
+Module proxies that import on first attribute access
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return `name` as a module whose body runs on first attribute access
+
+    Already-imported modules are returned as is. Parent packages are
+    still imported eagerly (they are usually cheap); the heavy module
+    itself is deferred until it is actually used.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,222 @@
+"""
+Dashboard Marts
+Runs the full pipeline headlessly and publishes the `events` and
+`drug_risk_profile` marts together with every table the dashboard views
+read, so a dashboard process only has to open files
+"""
+
+import logging
+import os
+import tempfile
+from contextlib import nullcontext
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+from .checkpoint import prune_checkpoints
+from .cooccurrence import drug_pairs, top_pairs_by_drug
+from .fda_api import FDAAPIClient
+from .lake import EventLake
+from .memory import MemoryTracker
+from .sampling import StratifiedSampler
+from .sketches import EventSketches
+from .snapshot import publish_snapshot
+from .trends import FREQUENCIES, TrendStore, trend_frames
+
+logger = logging.getLogger(__name__)
+
+# Set FDA_MARTS_DIR for the dashboard, precompute.py and api_server.py alike to move the marts
+MARTS_DIR = Path(os.environ.get("FDA_MARTS_DIR") or Path(tempfile.gettempdir()) / "fda_dashboard_snapshots")
+MARTS_VERSION = 9  # Increment when mart or view-table logic changes
+CHECKPOINT_DIR = Path(tempfile.gettempdir()) / "fda_dashboard_checkpoints"
+
+RECORD_LIMIT = 5000
+TOP_DRUGS_N = 20
+HIGH_RISK_N = 15
+
+# Stratified sample defaults (see utils/sampling.py)
+SAMPLE_DAYS = 365  # receivedate range the sample is drawn from, ending today
+SAMPLE_TARGET_HALF_WIDTH = 0.05  # top-drug fatality rates within ±5 points
+SAMPLE_MAX_RECORDS = 20000
+SAMPLE_SEED = 0
+
+# Incremental trend store and month-partitioned event lake, kept next to
+# the versions of each snapshot root
+TRENDS_DIR = "trends"
+LAKE_DIR = "lake"
+
+
+def marts_root(sampled: bool = False, base=MARTS_DIR, version: int = MARTS_VERSION) -> Path:
+    """Snapshot root for one dataset mode"""
+    suffix = "_sample" if sampled else ""
+    return Path(base) / f"cache_v{version}{suffix}"
+
+
+# -------------------------
+# View tables
+# -------------------------
+def source_stats(events: pd.DataFrame, drug_risk: pd.DataFrame) -> pd.DataFrame:
+    unique_reports = events['safetyreportid'].nunique()
+    return pd.DataFrame([{
+        'records': len(events),
+        'drugs': len(drug_risk),
+        'unique_reports': unique_reports,
+        'rows_per_report': len(events) / unique_reports if unique_reports else 0,
+    }])
+
+
+def overview_stats(drug_risk: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame([{
+        'total_drugs': len(drug_risk),
+        'total_events': drug_risk['total_adverse_events'].sum(),
+        'serious_events': drug_risk['serious_events'].sum(),
+        'deaths': drug_risk['death_reports'].sum(),
+        'life_threatening': drug_risk['life_threatening_events'].sum(),
+        'hospitalizations': drug_risk['hospitalization_events'].sum(),
+        'avg_patient_age': drug_risk['avg_patient_age'].mean()
+    }])
+
+
+def risk_distribution(drug_risk: pd.DataFrame) -> pd.DataFrame:
+    return drug_risk.groupby('risk_classification').agg({
+        'drug_name': 'count',
+        'total_adverse_events': 'sum',
+        'death_reports': 'sum'
+    }).reset_index().rename(columns={'drug_name': 'drug_count', 'total_adverse_events': 'total_events', 'death_reports': 'deaths'})
+
+
+def top_drugs(drug_risk: pd.DataFrame, n: int = TOP_DRUGS_N) -> pd.DataFrame:
+    return drug_risk.nlargest(n, 'total_adverse_events')
+
+
+def high_risk_drugs(drug_risk: pd.DataFrame, n: int = HIGH_RISK_N) -> pd.DataFrame:
+    return drug_risk[
+        (drug_risk['death_reports'] > 0) &
+        (drug_risk['total_adverse_events'] >= 10)
+    ].nlargest(n, 'fatality_rate')
+
+
+def age_analysis(events: pd.DataFrame) -> pd.DataFrame:
+    age_df = events[events['patient_age_years'].notna()].copy()
+    age_df['age_group'] = pd.cut(
+        age_df['patient_age_years'],
+        bins=[-float('inf'), 18, 45, 65, float('inf')],
+        labels=['Pediatric (<18)', 'Young Adult (18-44)', 'Middle Age (45-64)', 'Senior (65+)'],
+        right=False,
+    ).astype(str)
+
+    result = age_df.groupby('age_group').agg({
+        'drug_name': 'count',
+        'is_serious': 'sum',
+        'is_death': 'sum',
+        'patient_age_years': 'min'
+    }).reset_index()
+
+    result.columns = ['age_group', 'drug_count', 'total_events', 'deaths', 'min_age']
+    return result.sort_values('min_age')
+
+
+def event_details(events: pd.DataFrame) -> pd.DataFrame:
+    return events.groupby('patient_sex_name').agg({
+        'safetyreportid': 'count',
+        'is_serious': 'sum',
+        'is_death': 'sum',
+        'patient_age_years': 'mean'
+    }).reset_index().rename(columns={
+        'safetyreportid': 'event_count',
+        'is_serious': 'serious_count',
+        'is_death': 'death_count',
+        'patient_sex_name': 'patient_sex',
+        'patient_age_years': 'avg_age'
+    })
+
+
+def build_view_tables(events: pd.DataFrame, drug_risk: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Every table the dashboard views read, keyed `view_<name>`
+
+    Single-value summaries are one-row frames so they can be published
+    alongside the marts.
+    """
+    return {
+        'view_source_stats': source_stats(events, drug_risk),
+        'view_overview_stats': overview_stats(drug_risk),
+        'view_risk_distribution': risk_distribution(drug_risk),
+        'view_top_drugs': top_drugs(drug_risk),
+        'view_high_risk_drugs': high_risk_drugs(drug_risk),
+        'view_age_analysis': age_analysis(events),
+        'view_event_details': event_details(events),
+    }
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+def run_pipeline(root, sampled: bool = False, record_limit: int = RECORD_LIMIT,
+                 checkpoint_dir: Optional[str] = str(CHECKPOINT_DIR), workers: Optional[int] = 1,
+                 client: Optional[FDAAPIClient] = None, tracker: Optional[MemoryTracker] = None) -> str:
+    """
+    Extract, transform and publish one dataset version
+
+    Args:
+        root: Snapshot root; the new version becomes its `CURRENT`
+        sampled: Draw a stratified sample instead of the latest records
+        record_limit: Records fetched when not sampling
+        checkpoint_dir: Page checkpoints for resumable extracts; unused or
+            over-budget ones are pruned at the end of each run
+        workers: Transform processes (see `transform`)
+        tracker: Records time and memory per stage when given
+
+    Returns:
+        The published version name
+    """
+    client = client or FDAAPIClient()
+    stage = tracker.stage if tracker else lambda name: nullcontext()
+
+    sketches = EventSketches()
+
+    def sketch_page(skip, records):
+        # Fixed-memory summaries are fed page by page as the extract loads
+        nonlocal sketches
+        if skip == 0 and sketches.batches:
+            sketches = EventSketches()  # the load restarted; earlier pages were discarded
+        sketches.update(client._flatten_events(records))
+
+    with stage('extract'):
+        if sampled:
+            sampler = StratifiedSampler(client, date.today() - timedelta(days=SAMPLE_DAYS), date.today(), seed=SAMPLE_SEED)
+            raw_df = sampler.sample(target_half_width=SAMPLE_TARGET_HALF_WIDTH, max_records=SAMPLE_MAX_RECORDS)
+            sketches.update(raw_df)  # bounded by SAMPLE_MAX_RECORDS
+        else:
+            raw_df = client.fetch_adverse_events(limit=record_limit, checkpoint_dir=checkpoint_dir, on_page=sketch_page)
+
+    with stage('transform'):
+        transformed = client.transform_to_analytics(raw_df, workers=workers)
+    with stage('views'):
+        frames = {**transformed, **build_view_tables(transformed['events'], transformed['drug_risk_profile'])}
+
+    with stage('pairs'):
+        frames['drug_pairs'] = top_pairs_by_drug(drug_pairs(transformed['events']))
+
+    with stage('trends'):
+        # Trend counts persist across versions; only reports not seen before are added
+        trends = TrendStore.load(Path(root) / TRENDS_DIR)
+        trends.update(transformed['events'])
+        trends.save()
+        for freq in FREQUENCIES:
+            frames.update(trend_frames(trends, freq))
+
+    with stage('lake'):
+        # Appends new months and merges refetched ones; older partitions are not rewritten
+        EventLake(Path(root) / LAKE_DIR).append(transformed['events'])
+
+    with stage('publish'):
+        version = publish_snapshot(frames, root, attachments={'sketches': sketches.to_dict()})
+    logger.info(f"Published {len(frames)} tables for {len(raw_df)} records as {version}")
+
+    if checkpoint_dir:
+        # Per-drug queries from the dashboard add a checkpoint each; keep the root bounded
+        prune_checkpoints(checkpoint_dir)
+    return version
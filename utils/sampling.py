@@ -0,0 +1,199 @@
+"""
+Stratified Sampling
+Draws a reproducible sample of FAERS reports spread across receivedate
+windows and grows it until the rate estimates reach a target precision
+"""
+
+import hashlib
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .fda_api import build_search_query
+from .transform import RATE_CONFIDENCE, wilson_interval
+
+logger = logging.getLogger(__name__)
+
+# Records per sampled page; smaller pages spread the sample more evenly
+SAMPLE_PAGE_SIZE = 100
+
+
+def _stratum_seed(seed: int, start: str, end: str) -> int:
+    """Per-stratum RNG seed that depends only on the stratum, not on its position"""
+    digest = hashlib.sha1(f"{seed}:{start}:{end}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class StratifiedSampler:
+    """
+    Page-level stratified sample over a receivedate range
+
+    Strata are the windows from `FDAAPIClient.plan_date_windows`, each under
+    the skip ceiling so any page in it is reachable. Each stratum's pages are
+    visited in a fixed random order drawn from `seed`, and the sample is
+    allocated to strata in proportion to their report counts, so it is
+    (approximately) self-weighting and unweighted rates are unbiased.
+
+    Growing the sample only appends pages further down each stratum's
+    order: a sample of n records is always contained in the sample of 2n
+    drawn with the same seed.
+
+    The intervals treat sampled reports as independent. Reports within one
+    page sit next to each other in openFDA's index order, so a small
+    `page_size` keeps that assumption close.
+    """
+
+    def __init__(self, client, date_from, date_to, page_size: int = SAMPLE_PAGE_SIZE,
+                 seed: int = 0, **filters):
+        """
+        Args:
+            client: `FDAAPIClient` used for planning and page requests
+            date_from: First receivedate (inclusive)
+            date_to: Last receivedate (inclusive)
+            page_size: Records per sampled page (max 1000)
+            seed: Sample seed; the same seed draws the same reports
+            **filters: Extra `query_events` filters (drug, serious, sex)
+        """
+        self.client = client
+        self.page_size = page_size
+        self.seed = seed
+        self.filters = filters
+
+        self.strata = client.plan_date_windows(date_from, date_to, **filters)
+        self.population = sum(count for _, _, count in self.strata)
+        self.page_orders = [
+            np.random.default_rng(_stratum_seed(seed, start, end)).permutation(math.ceil(count / page_size))
+            for start, end, count in self.strata
+        ]
+        self.pages_taken = [0] * len(self.strata)
+        self.frames: List[pd.DataFrame] = []
+
+    @property
+    def sampled(self) -> int:
+        """Reports drawn so far"""
+        return sum(frame['safetyreportid'].nunique() for frame in self.frames if not frame.empty)
+
+    def allocate(self, n_records: int) -> List[int]:
+        """Pages per stratum for a sample of about `n_records` (proportional allocation)"""
+        if self.population == 0:
+            return [0] * len(self.strata)
+        fraction = min(n_records / self.population, 1.0)
+        return [
+            min(math.ceil(count * fraction / self.page_size), len(order))
+            for (_, _, count), order in zip(self.strata, self.page_orders)
+        ]
+
+    def _fetch_page(self, stratum: int, page: int) -> pd.DataFrame:
+        start, end, _ = self.strata[stratum]
+        params = {
+            'search': build_search_query(date_from=start, date_to=end, **self.filters),
+            'limit': self.page_size,
+            'skip': int(page) * self.page_size,
+        }
+        return self.client._flatten_events(self.client._get(params).get('results', []))
+
+    def draw(self, n_records: int, workers: int = 4) -> pd.DataFrame:
+        """
+        Extend the sample to about `n_records` reports
+
+        Returns:
+            Flattened events for the newly drawn pages only
+        """
+        pages = []
+        for stratum, target in enumerate(self.allocate(n_records)):
+            for position in range(self.pages_taken[stratum], target):
+                pages.append((stratum, self.page_orders[stratum][position]))
+            self.pages_taken[stratum] = max(self.pages_taken[stratum], target)
+
+        if not pages:
+            return pd.DataFrame()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(lambda page: self._fetch_page(*page), pages))
+
+        frames = [frame for frame in frames if not frame.empty]
+        new = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        self.frames.append(new)
+        logger.info(f"Drew {len(pages)} pages ({self.sampled} of {self.population} reports sampled)")
+        return new
+
+    def events(self) -> pd.DataFrame:
+        """All sampled events so far"""
+        frames = [frame for frame in self.frames if not frame.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def sample(self, target_half_width: float = 0.05, top_n: int = 20, initial: int = 1000,
+               growth: float = 2.0, max_records: int = 50_000, workers: int = 4,
+               confidence: float = RATE_CONFIDENCE) -> pd.DataFrame:
+        """
+        Grow the sample until the fatality rates of the top drugs are precise enough
+
+        Starting from `initial` reports, the sample grows by `growth` each
+        round until the widest confidence half-width among the `top_n`
+        drugs by report count is at most `target_half_width`, the whole
+        population is drawn, or `max_records` is reached.
+
+        Args:
+            target_half_width: Required CI half-width, as a proportion (0.05 = ±5 points)
+            top_n: Drugs whose fatality rates must reach the target
+            initial: Reports in the first round
+            growth: Sample size multiplier per round
+            max_records: Upper bound on reports drawn
+            workers: Pages fetched concurrently
+
+        Returns:
+            Flattened events, with a `sample_status` dict in `df.attrs`
+        """
+        size = min(initial, max_records)
+        rounds = 0
+        while True:
+            self.draw(size, workers=workers)
+            rounds += 1
+            half_width = self.precision(top_n, confidence)
+            exhausted = self.allocate(size) == [len(order) for order in self.page_orders]
+            logger.info(f"Round {rounds}: {self.sampled} reports, widest top-{top_n} half-width {half_width:.3f}")
+            if half_width <= target_half_width or exhausted or size >= max_records:
+                break
+            size = min(int(size * growth), max_records)
+
+        df = self.events()
+        df.attrs['sample_status'] = {
+            'strata': len(self.strata),
+            'population': self.population,
+            'sampled': self.sampled,
+            'sampling_fraction': self.sampled / self.population if self.population else 0.0,
+            'seed': self.seed,
+            'rounds': rounds,
+            'target_half_width': target_half_width,
+            'achieved_half_width': half_width,
+            'confidence': confidence,
+            'converged': half_width <= target_half_width,
+        }
+        return df
+
+    def precision(self, top_n: int = 20, confidence: float = RATE_CONFIDENCE) -> float:
+        """Widest fatality-rate CI half-width among the top drugs in the current sample"""
+        df = self.events()
+        if df.empty:
+            return math.inf
+        pairs = df.drop_duplicates(['drug_name', 'safetyreportid'])
+        deaths = pd.to_numeric(pairs['seriousnessdeath'], errors='coerce').fillna(0).eq(1)
+        per_drug = deaths.groupby(pairs['drug_name']).agg(['sum', 'count']).nlargest(top_n, 'count')
+        low, high = wilson_interval(per_drug['sum'], per_drug['count'], confidence)
+        return float(np.max((high - low) / 2)) if len(per_drug) else math.inf
+
+
+def sample_status_summary(status: Optional[Dict]) -> str:
+    """One-line description of a `sample_status` for captions and logs"""
+    if not status:
+        return ''
+    return (
+        f"Stratified sample of {status['sampled']:,} of {status['population']:,} reports "
+        f"({status['sampling_fraction']:.1%}) across {status['strata']} receivedate windows; "
+        f"top-drug fatality rates within ±{status['achieved_half_width'] * 100:.1f} points "
+        f"at {status['confidence']:.0%} confidence"
+    )
@@ -0,0 +1,316 @@
+"""
+Streaming Sketches
+Fixed-memory summaries updated per ingested batch: Space-Saving and
+Count-Min for heavy-hitter drugs and reactions, HyperLogLog for
+distinct report and patient counts
+"""
+
+import heapq
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+_UINT64_MASK = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def _hash(values, seed: int = 0) -> np.ndarray:
+    """
+    64-bit hashes of arbitrary scalars, deterministic for a given seed
+
+    Uses pandas' keyed hashing rather than `hash()`, so sketches built in
+    different processes agree and can be persisted and merged.
+    """
+    key = f'{seed:016d}'[-16:]
+    values = np.asarray(values)
+    if values.dtype.kind not in 'iuf':
+        values = values.astype(object)
+    return pd.util.hash_array(values, hash_key=key, categorize=False)
+
+
+class HyperLogLog:
+    """
+    Distinct-count estimator in 2^p one-byte registers
+
+    Relative standard error is 1.04 / sqrt(2^p): about 1.6% at the
+    default p=12 (4 KB).
+    """
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        h = _hash(values)
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = h & np.uint64((1 << (64 - self.p)) - 1)
+        # Rank = position of the lowest set bit; isolating it gives an exact power of two
+        lowest = rest & ((~rest + np.uint64(1)) & _UINT64_MASK)
+        rank = np.where(
+            rest == 0,
+            64 - self.p + 1,
+            np.log2(lowest.astype(np.float64)).astype(np.int64) + 1,
+        ).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: 'HyperLogLog'):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m ** 2 / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            # Small-range correction: linear counting
+            return self.m * math.log(self.m / zeros)
+        return float(raw)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def to_dict(self) -> Dict:
+        return {'p': self.p, 'registers': self.registers.tolist()}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'HyperLogLog':
+        sketch = cls(state['p'])
+        sketch.registers = np.asarray(state['registers'], dtype=np.uint8)
+        return sketch
+
+
+class CountMinSketch:
+    """
+    Frequency estimator for any key in a depth x width counter table
+
+    Estimates never undercount; with probability 1 - e^-depth they
+    overcount by at most e / width of the total stream weight.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    def _columns(self, keys) -> List[np.ndarray]:
+        return [(_hash(keys, seed=row + 1) % np.uint64(self.width)).astype(np.int64) for row in range(self.depth)]
+
+    def update(self, keys, counts=None):
+        if len(keys) == 0:
+            return
+        counts = np.ones(len(keys), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        for row, cols in enumerate(self._columns(keys)):
+            np.add.at(self.table[row], cols, counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, keys) -> np.ndarray:
+        if len(keys) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.min([self.table[row, cols] for row, cols in enumerate(self._columns(keys))], axis=0)
+
+    @property
+    def error_bound(self) -> float:
+        """Maximum overcount (absolute) that holds with probability `confidence`"""
+        return math.e / self.width * self.total
+
+    @property
+    def confidence(self) -> float:
+        return 1 - math.exp(-self.depth)
+
+    def to_dict(self) -> Dict:
+        return {'width': self.width, 'depth': self.depth, 'total': self.total, 'table': self.table.tolist()}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'CountMinSketch':
+        sketch = cls(state['width'], state['depth'])
+        sketch.table = np.asarray(state['table'], dtype=np.int64)
+        sketch.total = state['total']
+        return sketch
+
+
+class SpaceSaving:
+    """
+    Top-k heavy hitters with k counters
+
+    Each tracked item keeps a count and the maximum overcount it may carry
+    (the count of the item it evicted). Any item more frequent than
+    total / k is guaranteed to be tracked. The minimum counter is found
+    through a min-heap of (count, item) entries; entries made stale by an
+    increment are skipped when popped and the heap is rebuilt once stale
+    entries outnumber live ones 3 to 1, so each update costs O(log k)
+    amortized.
+    """
+
+    def __init__(self, k: int = 200):
+        self.k = k
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.total = 0
+        self._heap: List[Tuple[int, str]] = []
+
+    def _push(self, key: str):
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 4 * max(self.k, 1):
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self) -> str:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return key
+
+    def update(self, keys, counts=None):
+        if len(keys) == 0:
+            return
+        batch = pd.Series(1 if counts is None else counts, index=pd.Index(keys)).groupby(level=0).sum()
+        self.total += int(batch.sum())
+        # Largest first, so heavy items claim free counters before the tail
+        for key, count in batch.sort_values(ascending=False).items():
+            count = int(count)
+            if key in self.counts:
+                self.counts[key] += count
+            elif len(self.counts) < self.k:
+                self.counts[key] = count
+                self.errors[key] = 0
+            else:
+                victim = self._pop_min()
+                floor = self.counts.pop(victim)
+                self.errors.pop(victim)
+                self.counts[key] = floor + count
+                self.errors[key] = floor
+            self._push(key)
+
+    def top(self, n: int) -> pd.DataFrame:
+        """Top n items with their estimated count and guaranteed lower bound"""
+        items = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return pd.DataFrame({
+            'item': [key for key, _ in items],
+            'estimate': [count for _, count in items],
+            'lower_bound': [count - self.errors[key] for key, count in items],
+        })
+
+    @property
+    def error_bound(self) -> float:
+        """Maximum overcount of any reported item"""
+        return self.total / self.k
+
+    def to_dict(self) -> Dict:
+        return {'k': self.k, 'total': self.total, 'counts': self.counts, 'errors': self.errors}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'SpaceSaving':
+        sketch = cls(state['k'])
+        sketch.counts = dict(state['counts'])
+        sketch.errors = dict(state['errors'])
+        sketch.total = state['total']
+        sketch._rebuild_heap()
+        return sketch
+
+
+# FAERS has no patient identifier; this demographic fingerprint stands in for one
+PATIENT_KEY_COLUMNS = ['patient_sex', 'patient_age', 'patient_age_unit', 'patient_weight', 'receivedate']
+
+
+class EventSketches:
+    """
+    The dashboard's sketch set, fed one flattened batch at a time
+
+    Memory is fixed regardless of how many batches are ingested. A report's
+    rows must arrive in the same batch (true for API pages and date
+    windows), which makes the per-batch (drug, report) dedup exact.
+    """
+
+    def __init__(self, top_k: int = 200, cms_width: int = 2048, cms_depth: int = 4, hll_p: int = 12):
+        self.drugs = SpaceSaving(top_k)
+        self.drug_counts = CountMinSketch(cms_width, cms_depth)
+        self.reactions = SpaceSaving(top_k)
+        self.reports = HyperLogLog(hll_p)
+        self.patients = HyperLogLog(hll_p)
+        self.batches = 0
+
+    def update(self, batch: pd.DataFrame):
+        """Ingest one batch of flattened events (as from `_flatten_events`)"""
+        if batch.empty:
+            return
+
+        pairs = batch[['drug_name', 'safetyreportid']].dropna().drop_duplicates()
+        drug_names = pairs['drug_name'].to_numpy(dtype=object)
+        self.drugs.update(drug_names)
+        self.drug_counts.update(drug_names)
+
+        reports = batch.drop_duplicates('safetyreportid')
+        self.reports.update(reports['safetyreportid'].dropna().to_numpy(dtype=object))
+
+        patient_cols = [c for c in PATIENT_KEY_COLUMNS if c in reports.columns]
+        patient_keys = pd.util.hash_pandas_object(reports[patient_cols], index=False)
+        self.patients.update(patient_keys.to_numpy())
+
+        reactions = reports['reactions'].dropna().str.split('|').explode()
+        reactions = reactions[reactions != '']
+        self.reactions.update(reactions.to_numpy(dtype=object))
+
+        self.batches += 1
+
+    def top_drugs(self, n: int = 20) -> pd.DataFrame:
+        """
+        Approximate top drugs by report count
+
+        Columns: drug_name, total_adverse_events (estimate), min_adverse_events
+        (guaranteed lower bound)
+        """
+        top = self.drugs.top(n)
+        return top.rename(columns={
+            'item': 'drug_name',
+            'estimate': 'total_adverse_events',
+            'lower_bound': 'min_adverse_events',
+        })
+
+    def drug_count(self, drug_names) -> np.ndarray:
+        """Count-Min estimate of report counts for arbitrary drugs"""
+        return self.drug_counts.estimate(np.asarray(drug_names, dtype=object))
+
+    def summary(self) -> Dict:
+        """Point estimates with their error bounds"""
+        return {
+            'batches': self.batches,
+            'unique_reports': self.reports.estimate(),
+            'unique_reports_rel_error': self.reports.relative_error,
+            'unique_patients': self.patients.estimate(),
+            'unique_patients_rel_error': self.patients.relative_error,
+            'drug_report_pairs': self.drugs.total,
+            'top_drug_max_overcount': self.drugs.error_bound,
+            'drug_count_max_overcount': self.drug_counts.error_bound,
+            'drug_count_confidence': self.drug_counts.confidence,
+            'reaction_mentions': self.reactions.total,
+            'top_reaction_max_overcount': self.reactions.error_bound,
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'drugs': self.drugs.to_dict(),
+            'drug_counts': self.drug_counts.to_dict(),
+            'reactions': self.reactions.to_dict(),
+            'reports': self.reports.to_dict(),
+            'patients': self.patients.to_dict(),
+            'batches': self.batches,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'EventSketches':
+        sketches = cls()
+        sketches.drugs = SpaceSaving.from_dict(state['drugs'])
+        sketches.drug_counts = CountMinSketch.from_dict(state['drug_counts'])
+        sketches.reactions = SpaceSaving.from_dict(state['reactions'])
+        sketches.reports = HyperLogLog.from_dict(state['reports'])
+        sketches.patients = HyperLogLog.from_dict(state['patients'])
+        sketches.batches = state['batches']
+        return sketches
@@ -0,0 +1,186 @@
+"""
+Dataset Snapshots
+Publishes transformed frames as immutable Arrow IPC files that every
+session and server process memory-maps read-only
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process build lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CURRENT_POINTER = 'CURRENT'
+BUILD_LOCK = '.build.lock'
+ATTRS_METADATA_KEY = b'pandas_attrs'
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Convert a frame to Arrow, keeping `df.attrs` in the schema metadata"""
+    df = df.copy(deep=False)
+    for col in df.columns[df.dtypes == object]:
+        # FAERS fields are strings or missing; normalize stray scalars so Arrow gets one type
+        values = df[col]
+        df[col] = values.where(values.isna(), values.astype(str))
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if df.attrs:
+        metadata = dict(table.schema.metadata or {})
+        metadata[ATTRS_METADATA_KEY] = json.dumps(df.attrs, default=str).encode()
+        table = table.replace_schema_metadata(metadata)
+    return table
+
+
+def _from_arrow(table: pa.Table) -> pd.DataFrame:
+    """
+    Wrap an Arrow table as a DataFrame without copying column buffers
+
+    ArrowDtype columns reference the memory-mapped pages directly, so the
+    frame costs no private memory and is effectively read-only.
+    """
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    metadata = table.schema.metadata or {}
+    if ATTRS_METADATA_KEY in metadata:
+        df.attrs = json.loads(metadata[ATTRS_METADATA_KEY])
+    return df
+
+
+def publish_snapshot(frames: Dict[str, pd.DataFrame], root, keep: int = 3,
+                     attachments: Optional[Dict[str, Dict]] = None) -> str:
+    """
+    Write frames as a new snapshot version and make it current
+
+    Files are fully written into a fresh version directory before the
+    `CURRENT` pointer is swapped with an atomic rename, so readers see
+    either the old version or the new one, never a partial write. Older
+    versions beyond `keep` are removed; processes that already mapped
+    them keep valid mappings until they reopen. `attachments` are small
+    JSON documents (e.g. serialized sketches) published with the frames.
+
+    Returns:
+        The new version name
+    """
+    root = Path(root)
+    version = f"v{time.time_ns()}"
+    version_dir = root / version
+    version_dir.mkdir(parents=True)
+
+    for name, df in frames.items():
+        table = _to_arrow(df)
+        # Uncompressed IPC so readers can map buffers in place
+        with pa.OSFile(str(version_dir / f'{name}.arrow'), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    attachments = attachments or {}
+    for name, payload in attachments.items():
+        with open(version_dir / f'{name}.json', 'w') as f:
+            json.dump(payload, f)
+
+    with open(version_dir / 'meta.json', 'w') as f:
+        json.dump({
+            'version': version,
+            'frames': sorted(frames),
+            'attachments': sorted(attachments),
+            'published_at': time.time(),
+        }, f)
+
+    tmp_pointer = root / f'{CURRENT_POINTER}.{version}.tmp'
+    tmp_pointer.write_text(version)
+    os.replace(tmp_pointer, root / CURRENT_POINTER)
+    logger.info(f"Published snapshot {version} to {root}")
+
+    _prune(root, keep)
+    return version
+
+
+def _prune(root: Path, keep: int):
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and p.name.startswith('v'))
+    for old in versions[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+@contextmanager
+def build_lock(root, blocking: bool = True) -> Iterator[bool]:
+    """
+    Exclusive lock on rebuilding the snapshots under `root`, across processes
+
+    An advisory `flock` on a file in the root, released when the block
+    exits or the holder dies. Yields whether the lock is held: with
+    `blocking=False` it yields False at once if another process is
+    building. Callers should re-check `snapshot_age` once they hold it,
+    since the previous holder may just have published. Where `fcntl` is
+    unavailable this only yields True.
+    """
+    if fcntl is None:
+        yield True
+        return
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / BUILD_LOCK, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def current_version(root) -> Optional[str]:
+    """Name of the current snapshot version, or None if nothing is published"""
+    pointer = Path(root) / CURRENT_POINTER
+    try:
+        return pointer.read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_age(root) -> Optional[float]:
+    """Seconds since the current snapshot was published"""
+    version = current_version(root)
+    if version is None:
+        return None
+    with open(Path(root) / version / 'meta.json') as f:
+        return time.time() - json.load(f)['published_at']
+
+
+def open_snapshot(root, version: Optional[str] = None) -> Dict:
+    """
+    Memory-map a snapshot's frames
+
+    Returns:
+        Dict of DataFrames by name, plus `version` and `attachments`
+    """
+    root = Path(root)
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No snapshot published in {root}")
+
+    with open(root / version / 'meta.json') as f:
+        meta = json.load(f)
+
+    result = {'version': version, 'attachments': {}}
+    for name in meta.get('attachments', []):
+        with open(root / version / f'{name}.json') as f:
+            result['attachments'][name] = json.load(f)
+
+    for name in meta['frames']:
+        source = pa.memory_map(str(root / version / f'{name}.arrow'), 'r')
+        result[name] = _from_arrow(pa.ipc.open_file(source).read_all())
+    return result
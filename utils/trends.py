@@ -0,0 +1,266 @@
+"""
+Drug Trends
+Incremental per-drug daily count store keyed on `receivedate`, with
+rolling-window and EWMA spike detection computed across all drugs at once
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bucket sizes the store can be rolled up to
+FREQUENCIES = {'daily': 'D', 'weekly': 'W-MON'}
+
+# Spike detection defaults
+ROLLING_WINDOW = 8  # buckets in the trailing baseline
+EWMA_ALPHA = 0.3
+Z_THRESHOLD = 3.0
+MIN_COUNT = 5  # buckets with fewer reports never alert
+ALERT_LOOKBACK = 4  # trailing buckets reported as current alerts
+# Trailing buckets scored and published; comfortably longer than the rolling
+# window plus the EWMA warm-up (0.7 ** 20 < 0.1%)
+HISTORY_BUCKETS = {'daily': 180, 'weekly': 104}
+
+# Report ids are remembered only this far behind the newest counted day;
+# older reports are final and incoming ones that old are ignored
+SEEN_HORIZON_DAYS = 400
+
+COUNT_COLUMNS = ['reports', 'serious', 'deaths']
+
+
+class TrendStore:
+    """
+    Daily (drug, receivedate) report counts that grow one refresh at a time
+
+    Only aggregated counts and the ids of reports already counted are kept;
+    `update` adds the counts of unseen reports without touching history, so
+    refetching overlapping pages never double-counts. Ids are kept for
+    `SEEN_HORIZON_DAYS` behind the newest counted day, so the dedup set
+    stays bounded; reports received before that horizon are not counted.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.counts = pd.DataFrame({
+            'drug_name': pd.Series(dtype=object),
+            'day': pd.Series(dtype='datetime64[ns]'),
+            **{col: pd.Series(dtype=np.int64) for col in COUNT_COLUMNS},
+        })
+        self.seen = pd.DataFrame({'safetyreportid': pd.Series(dtype=object), 'day': pd.Series(dtype='datetime64[ns]')})
+
+    @classmethod
+    def load(cls, root) -> 'TrendStore':
+        store = cls(root)
+        if (store.root / 'counts.feather').exists():
+            store.counts = pd.read_feather(store.root / 'counts.feather')
+            store.seen = pd.read_feather(store.root / 'seen.feather')
+        return store
+
+    def save(self):
+        """Write both files, each replaced atomically"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        for name, df in (('counts', self.counts), ('seen', self.seen)):
+            tmp = self.root / f'{name}.feather.tmp'
+            df.reset_index(drop=True).to_feather(tmp)
+            os.replace(tmp, self.root / f'{name}.feather')
+
+    def horizon_start(self) -> Optional[pd.Timestamp]:
+        """Earliest day whose report ids are still remembered (None while empty)"""
+        if self.counts.empty:
+            return None
+        return self.counts['day'].max() - pd.Timedelta(days=SEEN_HORIZON_DAYS)
+
+    def update(self, events: pd.DataFrame) -> int:
+        """
+        Add silver events for reports not counted yet
+
+        Returns:
+            Number of new reports
+        """
+        days = pd.to_datetime(events['receivedate'].astype(str), format='%Y%m%d', errors='coerce')
+        cutoff = self.horizon_start()
+        if cutoff is not None:
+            stale = (days < cutoff).to_numpy()
+            if stale.any():
+                logger.info(f"Trend store: ignoring {int(stale.sum())} event rows received before {cutoff:%Y-%m-%d}")
+                events, days = events[~stale], days[~stale]
+
+        fresh = (~events['safetyreportid'].isin(self.seen['safetyreportid']) & days.notna()).to_numpy()
+        new, days = events[fresh], days[fresh]
+        keep = (~new.duplicated(['drug_name', 'safetyreportid']) & new['drug_name'].notna()).to_numpy()
+        new, days = new[keep], days[keep]
+        if new.empty:
+            return 0
+
+        batch = pd.DataFrame({
+            'drug_name': new['drug_name'].to_numpy(dtype=object),
+            'day': days.to_numpy(),
+            'reports': 1,
+            'serious': (new['is_serious'].to_numpy(dtype=float) == 1).astype(np.int64),
+            'deaths': (new['is_death'].to_numpy(dtype=float) == 1).astype(np.int64),
+        })
+        batch = batch.groupby(['drug_name', 'day'], as_index=False)[COUNT_COLUMNS].sum()
+
+        # Merge into the aggregated store; cost scales with (drug, day) cells, not with reports
+        self.counts = (
+            pd.concat([self.counts, batch], ignore_index=True)
+            .groupby(['drug_name', 'day'], as_index=False)[COUNT_COLUMNS].sum()
+        )
+        new_ids = pd.DataFrame({
+            'safetyreportid': new['safetyreportid'].to_numpy(dtype=object),
+            'day': days.to_numpy(),
+        }).drop_duplicates('safetyreportid')
+        self.seen = pd.concat([self.seen, new_ids], ignore_index=True)
+        self.seen = self.seen[self.seen['day'] >= self.horizon_start()].reset_index(drop=True)
+        logger.info(f"Trend store: {len(new_ids)} new reports, {len(self.counts)} drug-days, {len(self.seen)} ids kept")
+        return len(new_ids)
+
+    def matrix(self, freq: str = 'weekly', metric: str = 'reports', buckets: Optional[int] = None) -> pd.DataFrame:
+        """
+        Dense bucket x drug matrix of one count column
+
+        Every bucket in the covered range is present (empty ones are 0), so
+        rolling windows see real gaps. With `buckets`, only the trailing
+        buckets up to the newest one are built, and only drugs reported in
+        them are columns.
+        """
+        if self.counts.empty:
+            return pd.DataFrame()
+        rule = FREQUENCIES[freq]
+        bucket = _bucket_start(self.counts['day'], freq)
+        if buckets is None:
+            index = pd.date_range(bucket.min(), bucket.max(), freq=rule)
+        else:
+            index = pd.date_range(end=bucket.max(), periods=buckets, freq=rule)
+        in_range = (bucket >= index[0]).to_numpy()
+        wide = (
+            self.counts.loc[in_range, ['drug_name', metric]]
+            .assign(bucket=bucket[in_range])
+            .pivot_table(index='bucket', columns='drug_name', values=metric, aggfunc='sum', fill_value=0)
+        )
+        return wide.reindex(index, fill_value=0).rename_axis('bucket')
+
+
+def _bucket_start(days: pd.Series, freq: str) -> pd.Series:
+    """Label of the bucket each day falls in (weekly buckets start on Monday)"""
+    days = days.dt.normalize()
+    if freq == 'weekly':
+        return days - pd.to_timedelta(days.dt.weekday, unit='D')
+    return days
+
+
+def detect_spikes(counts: pd.DataFrame, deaths: Optional[pd.DataFrame] = None, window: int = ROLLING_WINDOW,
+                  alpha: float = EWMA_ALPHA, z_threshold: float = Z_THRESHOLD,
+                  min_count: int = MIN_COUNT) -> Dict[str, pd.DataFrame]:
+    """
+    Score every (bucket, drug) cell against its own trailing baseline
+
+    All drugs are scored together on the bucket x drug matrix: the rolling
+    baseline comes from column cumulative sums, and the EWMA is one pass
+    over the buckets updating every drug's state at once. Both baselines
+    use only earlier buckets, so a spike does not inflate the baseline it
+    is measured against. Standard deviations are floored at sqrt(mean)
+    (Poisson noise) and 1, so sparse drugs with flat history do not alert
+    on a single extra report.
+
+    Args:
+        counts: Bucket x drug report counts (`TrendStore.matrix`)
+        deaths: Matching death counts, for fatality rates alongside alerts
+
+    Returns:
+        Dict of bucket x drug frames: `rolling_mean`, `rolling_z`, `ewma`,
+        `ewma_z`, boolean `alert` and, with `deaths`, `fatality_rate`
+    """
+    x = counts.to_numpy(dtype=float)
+    n_buckets = len(x)
+
+    # Rolling window over the previous `window` buckets, from cumulative sums
+    csum = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(x, axis=0)])
+    csq = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(x ** 2, axis=0)])
+    ends = np.arange(n_buckets)
+    starts = np.maximum(ends - window, 0)
+    n = (ends - starts)[:, None].astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total = csum[ends] - csum[starts]
+        rolling_mean = total / n
+        rolling_var = (csq[ends] - csq[starts] - total * rolling_mean) / (n - 1)
+    valid = n >= max(2, window // 2)
+    rolling_mean = np.where(valid, rolling_mean, np.nan)
+    rolling_std = np.sqrt(np.where(valid, np.maximum(rolling_var, 0), np.nan))
+
+    # Exponentially weighted mean and variance, state as of the previous bucket
+    ewma = np.full_like(x, np.nan)
+    ewm_var = np.full_like(x, np.nan)
+    mean, var = x[0].copy(), np.zeros(x.shape[1])
+    for t in range(1, n_buckets):
+        if t >= 2:
+            ewma[t], ewm_var[t] = mean, var
+        diff = x[t] - mean
+        increment = alpha * diff
+        mean = mean + increment
+        var = (1 - alpha) * (var + diff * increment)
+
+    rolling_z = (x - rolling_mean) / _noise_floor(rolling_std, rolling_mean)
+    ewma_z = (x - ewma) / _noise_floor(np.sqrt(ewm_var), ewma)
+    alert = (x >= min_count) & ((rolling_z > z_threshold) | (ewma_z > z_threshold))
+
+    scores = {
+        'rolling_mean': rolling_mean,
+        'rolling_z': rolling_z,
+        'ewma': ewma,
+        'ewma_z': ewma_z,
+        'alert': alert,
+    }
+    if deaths is not None:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores['fatality_rate'] = np.where(x > 0, deaths.to_numpy(dtype=float) / x * 100, np.nan)
+    return {name: pd.DataFrame(values, index=counts.index, columns=counts.columns) for name, values in scores.items()}
+
+
+def _noise_floor(std: np.ndarray, mean: np.ndarray) -> np.ndarray:
+    return np.maximum(np.nan_to_num(std), np.sqrt(np.clip(np.nan_to_num(mean), 1, None)))
+
+
+def trend_frames(store: TrendStore, freq: str = 'weekly', lookback: int = ALERT_LOOKBACK,
+                 buckets: Optional[int] = None, **detect_kwargs) -> Dict[str, pd.DataFrame]:
+    """
+    Long-format trend table and current alert list for publishing
+
+    Only the trailing `buckets` (default `HISTORY_BUCKETS[freq]`) are
+    scored and published, and only cells with reports are rows, so the
+    tables grow with recent activity rather than with the store's span.
+    Empty buckets inside the window are implied zeros.
+
+    Returns:
+        `trend_<freq>`: one row per (drug, bucket) with reports, with scores
+        `trend_alerts_<freq>`: alerts in the last `lookback` buckets, worst first
+    """
+    buckets = buckets or HISTORY_BUCKETS[freq]
+    counts = store.matrix(freq, 'reports', buckets)
+    if counts.empty:
+        return {f'trend_{freq}': pd.DataFrame(), f'trend_alerts_{freq}': pd.DataFrame()}
+    deaths = store.matrix(freq, 'deaths', buckets).reindex_like(counts).fillna(0)
+    scores = detect_spikes(counts, deaths, **detect_kwargs)
+
+    observed = (counts.to_numpy() > 0).ravel()
+    n_buckets, n_drugs = counts.shape
+    long = pd.DataFrame({
+        'bucket': np.repeat(counts.index.to_numpy(), n_drugs)[observed],
+        'drug_name': np.tile(counts.columns.to_numpy(dtype=object), n_buckets)[observed],
+        'reports': counts.to_numpy().ravel()[observed],
+        'deaths': deaths.to_numpy().ravel()[observed],
+        **{name: frame.to_numpy().ravel()[observed] for name, frame in scores.items()},
+    })
+
+    recent = counts.index[-lookback:]
+    alerts = long[long['alert'] & long['bucket'].isin(recent)].copy()
+    alerts['z'] = alerts[['rolling_z', 'ewma_z']].max(axis=1)
+    alerts = alerts.sort_values('z', ascending=False).reset_index(drop=True)
+
+    return {f'trend_{freq}': long, f'trend_alerts_{freq}': alerts}